@@ -0,0 +1,51 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup of a fresh interpreter for each case, as paid by every short batch render
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "help": [os.path.join(ROOT,"holomap.py"),"--help"],
+    "import": ["-c","import holomap"],
+    "parse_config": ["-c","import holomap; holomap.HoloMapConfig.parse_args(['z^2','--alpha_resolution','64'])"],
+}
+
+# Modules that only the render stages need, they must not be imported to parse the config
+DEFERRED_MODULES = ("matplotlib","scipy","sympy","numexpr","numba")
+
+def time_case(args : list[str], repeat : int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable,*args],cwd=ROOT,stdout=subprocess.DEVNULL,check=True)
+        times.append(time.perf_counter()-start)
+
+    return statistics.median(times)
+
+def deferred_imports() -> list[str]:
+    code = "import sys, holomap; holomap.HoloMapConfig.parse_args(['z']); print(*sorted({{m.split('.')[0] for m in sys.modules}} & {!r}))".format(set(DEFERRED_MODULES))
+    return subprocess.run([sys.executable,"-c",code],cwd=ROOT,capture_output=True,text=True,check=True).stdout.split()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the startup time of holomap.py against a budget.")
+    parser.add_argument("--budget",type=float,default=0.75,help="Maximum median time in seconds of every case.")
+    parser.add_argument("--repeat",type=int,default=5,help="Number of runs of every case.")
+    args = parser.parse_args()
+
+    failed = False
+    for name, case_args in CASES.items():
+        median = time_case(case_args, args.repeat)
+        failed |= median > args.budget
+        print("{:<14}{:8.3f} s{}".format(name,median," (over budget)" if median > args.budget else ""))
+
+    imported = deferred_imports()
+    if imported:
+        failed = True
+        print("Imported while parsing the config: {}".format(", ".join(imported)))
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,ROOT)
+
+from src.mapping import ExpressionMapping, BACKENDS
+
+# Typical mappings, from a single ufunc to compositions with poles and branch cuts
+EXPRESSIONS = ("exp(z)","z^3+1/z","log((1+z)/(1-z))","sin(z)*cosh(z)","sqrt(z^2-1)","(z-i)/(z+i)")
+
+def time_mapping(mapping : ExpressionMapping, points : np.ndarray, repeat : int) -> float:
+    mapping(points) # Warm up caches and thread pools
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        mapping(points)
+        times.append(time.perf_counter()-start)
+
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the evaluation time of mappings with every backend.")
+    parser.add_argument("--points",type=int,nargs="+",default=[2**16,2**20,2**22],help="Number of points of every case.")
+    parser.add_argument("--repeat",type=int,default=5,help="Number of runs of every case.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    print("{:<20}{:>10}".format("expression","points") + "".join("{:>12}".format(b) for b in BACKENDS))
+    for expression in EXPRESSIONS:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            mappings = {b: ExpressionMapping(expression, backend=b) for b in BACKENDS}
+
+        for n in args.points:
+            points = rng.uniform(-2,2,n) + 1j*rng.uniform(-2,2,n)
+
+            cells = []
+            with np.errstate(all="ignore"):
+                for b, m in mappings.items():
+                    # Backends that fell back to numpy are marked instead of timed twice
+                    cells.append("{:>10.2f}ms".format(time_mapping(m, points, args.repeat)*1e3) if m.backend == b else "{:>12}".format("-"))
+
+            print("{:<20}{:>10}".format(expression,n) + "".join(cells))
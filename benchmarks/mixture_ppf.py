@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.stats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,ROOT)
+
+from src.mesh.domain_accumulation_mesh import DomainBetaAccumulationMesh
+
+# Accumulation setups as given on the command line: (accumulate values, concentration)
+CASES = (((0.5,),4), ((0.3,0.7),4), ((0.1,0.5,0.9),16), ((0.25,0.75),100))
+
+def time_ppf(ppf, q : np.ndarray, repeat : int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ppf(q)
+        times.append(time.perf_counter()-start)
+
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the tabulated mixture ppf against the generic scipy root finder.")
+    parser.add_argument("--samples",type=int,default=1000,help="Number of quantiles of every case.")
+    parser.add_argument("--repeat",type=int,default=3,help="Number of runs of every case.")
+    args = parser.parse_args()
+
+    q = np.linspace(0,1,args.samples)
+
+    print("{:<24}{:>14}{:>14}{:>10}{:>12}".format("values / concentration","scipy","tabulated","speedup","max error"))
+    for values, concentration in CASES:
+        mixture = DomainBetaAccumulationMesh._build_cached_rv(values, float(concentration))
+        mixture.ppf(q) # Build the quantile table
+
+        # The base class ppf is the generic root finder that the mixture used before it had its own
+        generic = lambda q: scipy.stats.rv_continuous._ppf(mixture, q)
+        scipy_time, tabulated_time = time_ppf(generic, q, args.repeat), time_ppf(mixture.ppf, q, args.repeat)
+        error = np.max(np.abs(mixture.ppf(q) - generic(q)))
+
+        print("{:<24}{:>12.4f} s{:>12.4f} s{:>9.0f}x{:>12.1e}".format("{} / {}".format(values,concentration),scipy_time,tabulated_time,scipy_time/tabulated_time,error))
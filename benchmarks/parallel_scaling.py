@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,ROOT)
+
+from src.mapping import ExpressionMapping
+from src.mesh import ParallelEvaluator
+
+# Typical chain of mappings, evaluated as a single fused function
+EXPRESSIONS = ("exp(z)","z^3+1/z","log((1+z)/(1-z))")
+
+def time_evaluation(evaluator : ParallelEvaluator, transformations : list, points : np.ndarray, repeat : int) -> float:
+    evaluator.apply(transformations, points) # Start the pool before timing
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        evaluator.apply(transformations, points)
+        times.append(time.perf_counter()-start)
+
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how the evaluation of mappings scales with the number of workers.")
+    parser.add_argument("--resolution",type=int,default=1024,help="Alpha and beta resolution of the mesh.")
+    parser.add_argument("--max_workers",type=int,default=os.cpu_count(),help="Largest number of workers to time.")
+    parser.add_argument("--repeat",type=int,default=3,help="Number of runs of every case.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-2,2,(args.resolution,args.resolution)) + 1j*rng.uniform(-2,2,(args.resolution,args.resolution))
+    transformations = [ExpressionMapping.compose(tuple(ExpressionMapping(e) for e in EXPRESSIONS))]
+
+    print("{:>8}{:>12}{:>10}{:>12}{:>10}".format("workers","thread","speedup","process","speedup"))
+    baseline = None
+    with np.errstate(all="ignore"):
+        for workers in range(1,args.max_workers+1):
+            cells = []
+            for pool in ("thread","process"):
+                evaluator = ParallelEvaluator(workers,pool=pool)
+                try:
+                    elapsed = time_evaluation(evaluator, transformations, points, args.repeat)
+                finally:
+                    evaluator.shutdown()
+
+                baseline = baseline or elapsed # Single thread worker, the serial path
+                cells.append("{:>10.1f}ms{:>9.2f}x".format(elapsed*1e3,baseline/elapsed))
+
+            print("{:>8}".format(workers) + "".join(cells))
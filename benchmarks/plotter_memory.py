@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.figure as mpl_figure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,ROOT)
+
+from src.mesh_plotter import MeshPlotter
+
+# Peak traced memory and wall time of plot_mesh followed by a draw of the figure, run on two checkouts to compare them
+CASES = {
+    "fixed color, markers": dict(points_color="#0000ff", grid_color="#0000ff", markersize=1),
+    "colormap, markers": dict(points_color=matplotlib.colormaps["viridis"], grid_color=matplotlib.colormaps["viridis"], markersize=1),
+    "fixed color, no markers": dict(points_color="#0000ff", grid_color="#0000ff", markersize=0),
+    "colormap, no markers": dict(points_color=matplotlib.colormaps["viridis"], grid_color=matplotlib.colormaps["viridis"], markersize=0),
+}
+
+def mesh_points(resolution : int) -> np.ndarray:
+    # exp(z) over a disk, as MeshPlotter receives it from ComplexToMesh2D
+    radius, angle = np.linspace(0,1,resolution), np.linspace(0,2*np.pi,resolution)
+    points = np.exp(2*radius[:,None]*np.exp(1j*angle[None,:]))
+    return np.stack((points.real,points.imag),axis=-1)
+
+def plot_and_draw(plotter : MeshPlotter, points : np.ndarray):
+    fig = mpl_figure.Figure(figsize=(4,4),dpi=100)
+    plotter.plot_mesh(points, fig.add_subplot(1,1,1))
+    fig.canvas.draw()
+
+def measure(plotter : MeshPlotter, points : np.ndarray, repeat : int) -> tuple[float,int]:
+    # Memory is traced on its own run, tracing slows down allocation and would distort the times
+    tracemalloc.start()
+    plot_and_draw(plotter, points)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        plot_and_draw(plotter, points)
+        times.append(time.perf_counter()-start)
+
+    return min(times), peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the peak memory and time of MeshPlotter.plot_mesh and the figure draw.")
+    parser.add_argument("--resolutions",type=int,nargs="+",default=[200,300],help="Alpha and beta resolution of every mesh.")
+    parser.add_argument("--repeat",type=int,default=3,help="Number of timed runs of every case.")
+    args = parser.parse_args()
+
+    print("{:>12}{:>26}{:>12}{:>12}".format("resolution","case","peak","time"))
+    for resolution in args.resolutions:
+        points = mesh_points(resolution)
+        for name, plotter_args in CASES.items():
+            elapsed, peak = measure(MeshPlotter(linewidth=0.1, **plotter_args), points, args.repeat)
+            print("{:>12}{:>26}{:>9.1f}MiB{:>11.2f}s".format(resolution,name,peak/2**20,elapsed))
@@ -2,6 +2,10 @@ import numpy as np
 
 from typing import Tuple, Union
 
+# Floating type in which to compute points for the given parameters, so that single precision is kept
+def real_dtype(*parameters : np.ndarray) -> np.dtype:
+    return np.result_type(*(np.asarray(p).dtype for p in parameters), np.float32)
+
 # Base class
 class Domain:
     def get_points(self, alpha : np.ndarray, beta : np.ndarray) -> np.ndarray: raise NotImplementedError()
@@ -42,8 +46,8 @@ class OpenDomain(DomainWrapper):
         else:
             lower_beta, upper_beta = self.epsilon, 1-self.epsilon
 
-        alpha = np.interp(alpha,(0,1),(lower_alpha,upper_alpha))
-        beta = np.interp(beta,(0,1),(lower_beta,upper_beta))
+        alpha = np.interp(alpha,(0,1),(lower_alpha,upper_alpha)).astype(real_dtype(alpha), copy=False)
+        beta = np.interp(beta,(0,1),(lower_beta,upper_beta)).astype(real_dtype(beta), copy=False)
 
         return self.__get_points(alpha, beta)
     
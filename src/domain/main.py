@@ -1,4 +1,4 @@
-from .domain import ComplexDomain, OpenDomain
+from .domain import ComplexDomain, OpenDomain, real_dtype
 
 import numpy as np
 
@@ -22,8 +22,9 @@ class RadialComplexDomain(OpenDomain,ComplexDomain):
         self.angle_range = angle_range
 
     def get_points(self, alpha : np.ndarray, beta : np.ndarray) -> np.ndarray:
-        radial_points = np.interp(alpha,(0,1),self.radius_range)
-        angular_points = np.exp(np.interp(beta,(0,1),self.angle_range)*1j)
+        dtype = real_dtype(alpha,beta)
+        radial_points = np.interp(alpha,(0,1),self.radius_range).astype(dtype, copy=False)
+        angular_points = np.exp(np.interp(beta,(0,1),self.angle_range)*1j).astype(np.result_type(dtype,np.complex64), copy=False)
 
         points = radial_points[:,None] * angular_points[None,:]
         return points
@@ -50,8 +51,9 @@ class QuadrantsComplexDomain(OpenDomain,ComplexDomain):
         if self.reflect_x: alpha_range = (-1,1)
         if self.reflect_y: beta_range = (-1,1)
         
-        x = np.interp(alpha,(0,1),alpha_range)
-        y = np.interp(beta,(0,1),beta_range)
+        dtype = real_dtype(alpha,beta)
+        x = np.interp(alpha,(0,1),alpha_range).astype(dtype, copy=False)
+        y = np.interp(beta,(0,1),beta_range).astype(dtype, copy=False)
 
         x = 1/(1-x) - 1/(1+x)
         y = 1/(1-y) - 1/(1+y)
@@ -0,0 +1,4 @@
+from .expression import ExpressionMapping, fuse_mappings
+from .backends import BACKENDS
+
+__all__ = [ExpressionMapping, fuse_mappings, BACKENDS]
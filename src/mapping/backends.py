@@ -0,0 +1,126 @@
+import numpy as np
+
+from .compiler import FUNCTIONS, ARGUMENT, function_source
+
+import ast
+import copy
+import warnings
+
+from typing import Callable, List
+
+BACKENDS = ("numpy","numexpr","numba")
+
+# Numexpr names of the whitelisted functions it implements for complex arguments
+_NUMEXPR_FUNCTIONS = {
+    **{name: name for name in (
+        "exp","expm1","log","log10","log1p","sqrt",
+        "sin","cos","tan","arcsin","arccos","arctan","sinh","cosh","tanh","arcsinh","arccosh","arctanh",
+        "conj","real","imag")},
+    "ln": "log", "abs": "abs", "absolute": "abs", "conjugate": "conj", "re": "real", "im": "imag",
+    "asin": "arcsin", "acos": "arccos", "atan": "arctan", "asinh": "arcsinh", "acosh": "arccosh", "atanh": "arctanh",
+}
+
+# Points on which every compiled backend is checked against numpy, from the origin to far away in every direction
+_PROBE_POINTS = np.multiply.outer(np.array([0,1e-3,0.1,0.5,0.9,1,1.1,2,10,1e3]), np.exp(2j*np.pi*np.arange(16)/16 + 0.1j)).ravel()
+
+class _NumexprTransformer(ast.NodeTransformer):
+    def visit_Call(self, node : ast.Call) -> ast.AST:
+        node.args = [self.visit(arg) for arg in node.args]
+        name = node.func.id
+
+        # Functions numexpr lacks but that are plain arithmetic
+        match name:
+            case "square": return ast.BinOp(node.args[0], ast.Pow(), ast.Constant(2.0))
+            case "reciprocal": return ast.BinOp(ast.Constant(1.0), ast.Div(), node.args[0])
+            case "power": return ast.BinOp(node.args[0], ast.Pow(), node.args[1])
+
+        if name not in _NUMEXPR_FUNCTIONS:
+            raise ValueError("""Function "{}" not supported by numexpr.""".format(name))
+
+        node.func = ast.Name(_NUMEXPR_FUNCTIONS[name], ast.Load())
+        return node
+
+
+def compile_backend(trees : List[ast.expr], backend : str, reference : Callable[[np.ndarray],np.ndarray]) -> Callable[[np.ndarray],np.ndarray] | None:
+    # Function evaluating the expressions with the backend, None if the backend is not installed, cannot compile them or disagrees with the numpy reference
+    match backend:
+        case "numpy": return reference
+        case "numexpr": compiler = _compile_numexpr
+        case "numba": compiler = _compile_numba
+        case _: raise ValueError("""Argument "backend" ({}) not valid, value must be one of {}.""".format(backend, ", ".join(BACKENDS)))
+
+    try:
+        function = compiler(trees, reference)
+        matches = _matches_reference(function, reference)
+    except ImportError:
+        return None
+    except Exception as e:
+        warnings.warn("Mapping could not be compiled with {} ({}), evaluating it with numpy.".format(backend, e), RuntimeWarning, stacklevel=3)
+        return None
+
+    if not matches:
+        warnings.warn("Mapping evaluated with {} differs from numpy, evaluating it with numpy.".format(backend), RuntimeWarning, stacklevel=3)
+        return None
+
+    return _with_reference_dtype(function, reference)
+
+def _with_reference_dtype(function : Callable, reference : Callable) -> Callable:
+    # Backends compute in complex, real valued mappings (abs, arg, real...) are returned with the dtype numpy gives them
+    dtypes = dict()
+
+    def mapping(points : np.ndarray) -> np.ndarray:
+        points = np.asarray(points)
+        if points.dtype not in dtypes:
+            with np.errstate(all="ignore"):
+                dtypes[points.dtype] = np.asarray(reference(np.ones(1, dtype=points.dtype))).dtype
+
+        result, dtype = function(points), dtypes[points.dtype]
+        if np.iscomplexobj(result) and dtype.kind != "c":
+            result = result.real # The imaginary part is zero
+        return result.astype(dtype, copy=False)
+
+    return mapping
+
+def _matches_reference(function : Callable, reference : Callable) -> bool:
+    with np.errstate(all="ignore"):
+        expected = np.broadcast_to(reference(_PROBE_POINTS), _PROBE_POINTS.shape)
+        result = np.broadcast_to(function(_PROBE_POINTS), _PROBE_POINTS.shape)
+
+    # Poles and overflows are left out, backends disagree on how they turn infinite
+    finite = np.isfinite(expected)
+    return np.allclose(result[finite], expected[finite], rtol=1e-6, atol=1e-12)
+
+def _compile_numexpr(trees : List[ast.expr], reference : Callable) -> Callable:
+    import numexpr
+
+    # Trees are shared with the numpy function, they are renamed on a copy
+    sources = [ast.unparse(_NumexprTransformer().visit(copy.deepcopy(tree))) for tree in trees]
+
+    def mapping(points : np.ndarray) -> np.ndarray:
+        points = np.asarray(points)
+        if points.dtype != np.complex128: # Numexpr only evaluates complex numbers in double precision
+            return reference(points)
+
+        for source in sources:
+            points = numexpr.evaluate(source, local_dict={ARGUMENT: points})
+        return points
+
+    return mapping
+
+def _compile_numba(trees : List[ast.expr], reference : Callable) -> Callable:
+    import numba
+
+    namespace = dict(FUNCTIONS)
+    exec(compile(function_source(trees), "<mapping>", "exec"), namespace)
+
+    # Compiled ahead of time for both precisions, so that errors surface here and not on the first render
+    vectorized = numba.vectorize(["complex128(complex128)","complex64(complex64)"], target="parallel")(namespace["mapping"])
+
+    def mapping(points : np.ndarray) -> np.ndarray:
+        # Numba raises on complex division by zero, where numpy returns infinities and nans
+        try:
+            return vectorized(points)
+        except ArithmeticError:
+            return reference(points)
+
+    return mapping
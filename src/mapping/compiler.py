@@ -0,0 +1,112 @@
+import numpy as np
+
+import ast
+import re
+
+from typing import Callable, Iterable
+
+# Functions a mapping may call, all of them numpy ufuncs defined for complex arguments
+FUNCTIONS = {
+    **{name: getattr(np,name) for name in (
+        "exp","exp2","expm1","log","log2","log10","log1p","sqrt","square","reciprocal","power",
+        "sin","cos","tan","arcsin","arccos","arctan","sinh","cosh","tanh","arcsinh","arccosh","arctanh",
+        "conj","conjugate","real","imag","absolute","angle","sign")},
+    # Common math notation
+    "ln": np.log, "abs": np.absolute, "re": np.real, "im": np.imag, "arg": np.angle,
+    "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan, "asinh": np.arcsinh, "acosh": np.arccosh, "atanh": np.arctanh,
+}
+
+CONSTANTS = {"pi": np.pi, "e": np.e, "E": np.e, "tau": 2*np.pi, "i": 1j, "I": 1j}
+
+ARGUMENT = "_z" # Not a valid name in mappings, so it cannot clash with the whitelist
+
+# Imaginary literals written with an i suffix (2i, 0.5i, 1e-3i)
+_IMAGINARY_LITERAL = re.compile(r"(?<![\w.])((?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)i\b")
+
+def _arity(function : str) -> int:
+    # Number of operands, real, imag and angle are plain functions of one argument
+    return getattr(FUNCTIONS[function], "nin", 1)
+
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.UAdd, ast.USub)
+
+class _MappingTransformer(ast.NodeTransformer):
+    def __init__(self, variables : Iterable[str]):
+        self.variables = set(variables)
+
+    def visit_Expression(self, node : ast.Expression) -> ast.AST:
+        return ast.Expression(self.visit(node.body))
+
+    def visit_BinOp(self, node : ast.BinOp) -> ast.AST:
+        if not isinstance(node.op, _OPERATORS):
+            raise ValueError("""Operator "{}" not allowed in mappings.""".format(type(node.op).__name__))
+
+        node = self.generic_visit(node)
+
+        # e^x is evaluated as exp(x), as lambdify did
+        if isinstance(node.op, ast.Pow) and isinstance(node.left, ast.Constant) and node.left.value == np.e:
+            return ast.Call(ast.Name("exp",ast.Load()), [node.right], [])
+
+        return node
+
+    def visit_UnaryOp(self, node : ast.UnaryOp) -> ast.AST:
+        if not isinstance(node.op, _OPERATORS):
+            raise ValueError("""Operator "{}" not allowed in mappings.""".format(type(node.op).__name__))
+
+        return self.generic_visit(node)
+
+    def visit_Call(self, node : ast.Call) -> ast.AST:
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ValueError("""Function "{}" not allowed in mappings.""".format(ast.unparse(node.func)))
+        if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise ValueError("""Function "{}" only takes positional arguments in mappings.""".format(node.func.id))
+        if len(node.args) != _arity(node.func.id):
+            # Extra arguments of ufuncs are output arrays, not operands
+            raise ValueError("""Function "{}" takes {} argument(s) in mappings, {} given.""".format(node.func.id, _arity(node.func.id), len(node.args)))
+
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node : ast.Name) -> ast.AST:
+        if node.id in self.variables:
+            return ast.Name(ARGUMENT, ast.Load())
+        if node.id in CONSTANTS:
+            return ast.Constant(CONSTANTS[node.id])
+
+        raise ValueError("""Name "{}" not allowed in mappings.""".format(node.id))
+
+    def visit_Constant(self, node : ast.Constant) -> ast.AST:
+        if type(node.value) not in (int, float, complex):
+            raise ValueError("""Constant {!r} not allowed in mappings.""".format(node.value))
+
+        # Integer powers of integer literals would otherwise be computed exactly, without bound
+        return ast.Constant(float(node.value)) if type(node.value) is int else node
+
+    def generic_visit(self, node : ast.AST) -> ast.AST:
+        if not isinstance(node, (ast.BinOp, ast.UnaryOp, *_OPERATORS)):
+            raise ValueError("""Syntax "{}" not allowed in mappings.""".format(type(node).__name__))
+
+        return ast.NodeTransformer.generic_visit(self, node)
+
+
+def parse_expression(expression : str, variables : Iterable[str] = ("z",)) -> ast.expr:
+    # Expression tree in which the variables are the argument of the mapping, only whitelisted functions and constants are allowed
+    try:
+        # ^ is a power in math notation, replaced before parsing so that it keeps the precedence of **
+        tree = ast.parse(_IMAGINARY_LITERAL.sub("\\1j", expression.strip()).replace("^","**"), mode="eval")
+    except SyntaxError as e:
+        raise ValueError("""Expression "{}" not valid, {}.""".format(expression, e.msg)) from None
+
+    return _MappingTransformer(variables).visit(tree).body
+
+def compile_expressions(trees : Iterable[ast.expr]) -> Callable[[np.ndarray],np.ndarray]:
+    namespace = {"__builtins__": {}, **FUNCTIONS}
+    exec(compile(function_source(trees), "<mapping>", "exec"), namespace)
+    return namespace["mapping"]
+
+def function_source(trees : Iterable[ast.expr], name : str = "mapping") -> str:
+    # Single function applying the expressions one after the other, each one reads the result of the previous one
+    lines = ["def {}({}):".format(name, ARGUMENT)]
+    lines += ["    {} = {}".format(ARGUMENT, ast.unparse(tree)) for tree in trees]
+    lines += ["    return {}".format(ARGUMENT)]
+
+    return "\n".join(lines)
@@ -0,0 +1,64 @@
+import numpy as np
+
+from .compiler import parse_expression, compile_expressions
+from .backends import compile_backend
+
+import functools
+
+from typing import List, Callable
+
+class ExpressionMapping:
+    def __init__(self, expression : str, symbol : str = "z", *, aliases : tuple[str,...] = (), backend : str = "numpy", _stages : tuple["ExpressionMapping",...] = None):
+        # Aliases are other names accepted for the variable
+        self.expression = expression
+        self.symbol = symbol
+        self.aliases = tuple(aliases)
+        self.requested_backend = backend
+
+        self._stages = _stages # Set on compositions
+        self._trees = [parse_expression(expression, (symbol,*self.aliases))] if _stages is None else [t for m in _stages for t in m._trees]
+        self._function = compile_expressions(self._trees)
+
+        # Falls back to numpy if the backend is not available for the expression
+        function = compile_backend(self._trees, backend, self._function)
+        self.backend = backend if function is not None else "numpy"
+        self._function = function or self._function
+
+    def __call__(self, points : np.ndarray) -> np.ndarray:
+        return self._function(points)
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__,self.expression)
+
+    def __reduce__(self):
+        # Rebuilt from source on unpickling (e.g. in process workers), the compiled function itself is not picklable
+        if self._stages is not None:
+            return ExpressionMapping.compose, (self._stages,)
+        return _load_mapping, (self.expression, self.symbol, self.aliases, self.requested_backend)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def compose(mappings : tuple["ExpressionMapping",...]) -> "ExpressionMapping":
+        # Composition of the mappings (first applied first) compiled into a single function, in which every stage assigns the variable of the next one
+        return ExpressionMapping(tuple(m.expression for m in mappings), mappings[0].symbol, backend=mappings[0].requested_backend, _stages=mappings)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_mapping(expression : str, symbol : str, aliases : tuple[str,...] = (), backend : str = "numpy") -> ExpressionMapping:
+    return ExpressionMapping(expression, symbol, aliases=aliases, backend=backend)
+
+
+def fuse_mappings(transformations : List[Callable]) -> List[Callable]:
+    # Replace every run of consecutive ExpressionMappings by its composition, other callables are kept as they are
+    fused, run = [], []
+    for t in [*transformations, None]:
+        if isinstance(t,ExpressionMapping):
+            run.append(t)
+            continue
+
+        fused.extend([ExpressionMapping.compose(tuple(run))] if len(run) > 1 else run)
+
+        run = []
+        if t is not None: fused.append(t)
+
+    return fused
@@ -1,4 +1,6 @@
 from .main import build_domain_mesh
-from .mesh import ComplexToMesh2D, TransformedMesh, CachedMesh
+from .mesh import ComplexToMesh2D, TransformedMesh, CachedMesh, PrecisionWarning, shared_evaluation
+from .cache import MeshStore, DiskMeshStore, default_mesh_store, hash_key
+from .parallel import ParallelEvaluator
 
-__all__ = [build_domain_mesh, ComplexToMesh2D, TransformedMesh, CachedMesh]
\ No newline at end of file
+__all__ = [build_domain_mesh, ComplexToMesh2D, TransformedMesh, CachedMesh, MeshStore, DiskMeshStore, default_mesh_store, hash_key, ParallelEvaluator, PrecisionWarning, shared_evaluation]
\ No newline at end of file
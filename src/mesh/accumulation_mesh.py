@@ -1,8 +1,11 @@
-from .mesh import Mesh, TransformableMesh, WrappedMesh
+from .mesh import Mesh, MeshTile, TransformableMesh, WrappedMesh, evaluate_shared
+from ..profiling import profile_stage
 
 import numpy as np
 import numpy.typing as npt
 
+from typing import Iterator, Tuple
+
 class AccumulationMesh(TransformableMesh):
     def __init__(self, 
                  base_mesh : Mesh,
@@ -10,23 +13,91 @@ class AccumulationMesh(TransformableMesh):
         
         WrappedMesh.__init__(self,base_mesh)
         self.get_mesh_points, self.__get_mesh_points = self.__get_mesh_points, self.get_mesh_points
+        self.iter_mesh_tiles, self.__iter_mesh_tiles = self.__iter_mesh_tiles, self.iter_mesh_tiles
 
         self.accumulate_points = np.array() if accumulate_points is None else np.asarray(accumulate_points, copy=True)
 
     def __get_mesh_points(self):
-        mesh_points = self.__get_mesh_points()
-        return self._accumulate_mesh(mesh_points) if self.accumulate_points.size else mesh_points
+        return evaluate_shared(self, lambda: self._accumulate_points(self.__get_mesh_points()))
+
+    def _points_at(self, alpha : np.ndarray, beta : np.ndarray) -> np.ndarray:
+        # Points for sampled parameters of the domain mesh this one wraps
+        return self._accumulate_points(self.base_mesh._points_at(alpha, beta))
+
+    def _accumulate_points(self, mesh_points : np.ndarray) -> np.ndarray:
+        if not self.accumulate_points.size: return mesh_points
+
+        with profile_stage("mesh_accumulation") as stage:
+            mesh_points = self._accumulate_mesh(mesh_points)
+            stage.record_points(mesh_points)
+
+        return mesh_points
+
+    def __iter_mesh_tiles(self, tile_shape : Tuple[int,int]) -> Iterator[MeshTile]:
+        # Accumulation displaces each point independently, so it applies tile by tile
+        for index, tile in self.__iter_mesh_tiles(tile_shape):
+            yield index, self._accumulate_points(tile)
     
     def _accumulate_mesh(self, mesh_points : np.ndarray) -> np.ndarray:
         raise NotImplementedError()
     
 
 class DistanceModulatedAccumulationMesh(AccumulationMesh):
+    def __init__(self, 
+                 base_mesh : Mesh,
+                 accumulate_points : npt.ArrayLike = None,
+                 *,
+                 cutoff_radius : float = None,
+                 block_size : int = 2**16):
+        AccumulationMesh.__init__(self,base_mesh,accumulate_points)
+
+        self.cutoff_radius = cutoff_radius
+        self.block_size = block_size
+
+        self._attractor_index : "scipy.spatial.cKDTree" = None
+
     def _accumulate_mesh(self, mesh_points : np.ndarray) -> np.ndarray:
-        diff = self.accumulate_points[:,None,None] - mesh_points[None,:]
-        mesh_points = mesh_points + np.mean(diff*self._distance_factor(self._point_norm(diff)),axis=0)
+        # Running sum over attractors, so memory stays proportional to the mesh
+        if self.cutoff_radius is None:
+            return mesh_points + self._accumulate_displacement(mesh_points, self.accumulate_points)/self.accumulate_points.size
 
-        return mesh_points
+        # Row blocks only visit the attractors within the cutoff radius of their bounding box
+        attractors = self._get_attractor_index()
+        displacement = np.zeros_like(mesh_points)
+
+        rows = max(1,self.block_size//max(1,mesh_points[0].size)) if mesh_points.ndim > 1 else self.block_size
+        for start in range(0,mesh_points.shape[0],rows):
+            block = mesh_points[start:start+rows]
+            if not block.size: continue
+
+            finite = block[np.isfinite(block)]
+            if not finite.size: continue
+            lower, upper = np.array([finite.real.min(),finite.imag.min()]), np.array([finite.real.max(),finite.imag.max()])
+
+            near = attractors.query_ball_point((lower+upper)/2, np.linalg.norm(upper-lower)/2 + self.cutoff_radius)
+            if near:
+                displacement[start:start+rows] = self._accumulate_displacement(block, self.accumulate_points[np.sort(near)])
+
+        return mesh_points + displacement/self.accumulate_points.size
+
+    def _accumulate_displacement(self, mesh_points : np.ndarray, accumulate_points : np.ndarray) -> np.ndarray:
+        displacement = np.zeros_like(mesh_points)
+        for p in accumulate_points.astype(mesh_points.dtype):
+            diff = p - mesh_points
+            d = self._point_norm(diff)
+
+            factor = self._distance_factor(d)
+            if self.cutoff_radius is not None: factor[d > self.cutoff_radius] = 0
+
+            displacement += diff*factor
+
+        return displacement
+
+    def _get_attractor_index(self) -> "scipy.spatial.cKDTree":
+        if self._attractor_index is None:
+            import scipy.spatial
+            self._attractor_index = scipy.spatial.cKDTree(np.stack((self.accumulate_points.real,self.accumulate_points.imag),axis=1))
+        return self._attractor_index
 
     def _distance_factor(self, d : np.ndarray) -> np.ndarray:
         raise NotImplementedError()
@@ -37,8 +108,11 @@ class GaussianAccumulationMesh(DistanceModulatedAccumulationMesh):
                  base_mesh : Mesh,
                  accumulate_points : npt.ArrayLike = None,
                  *,
-                 sharpness : float = 1):
-        DistanceModulatedAccumulationMesh.__init__(self,base_mesh,accumulate_points)
+                 sharpness : float = 1,
+                 cutoff : float = None):
+        # Attractors further than "cutoff" gaussian widths (1/sharpness) from a point are ignored
+        DistanceModulatedAccumulationMesh.__init__(self,base_mesh,accumulate_points,
+            cutoff_radius=None if cutoff is None else cutoff/sharpness)
 
         self.sharpness = sharpness
 
@@ -0,0 +1,193 @@
+import numpy as np
+
+import collections
+import hashlib
+import os
+
+from typing import Any, Callable
+
+def hash_key(*parts : Any) -> str:
+    # Deterministic across processes, unlike hash()
+    digest = hashlib.sha256()
+    _update_digest(digest, parts)
+    return digest.hexdigest()
+
+def _update_digest(digest : "hashlib._Hash", value : Any):
+    # Arrays are hashed by content, their repr elides the middle of large arrays
+    if isinstance(value, np.ndarray):
+        digest.update("ndarray{}{}".format(value.shape, value.dtype.str).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (tuple, list)):
+        digest.update("{}{}(".format(type(value).__name__, len(value)).encode())
+        for v in value: _update_digest(digest, v)
+        digest.update(b")")
+    else:
+        digest.update(repr(value).encode())
+
+class MeshStore:
+    def __init__(self, max_bytes : int = 2**29):
+        self.max_bytes = max_bytes
+
+        self._arrays : collections.OrderedDict[str,np.ndarray] = collections.OrderedDict()
+        self.nbytes = 0
+
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def get(self, key : str) -> np.ndarray:
+        if key not in self._arrays:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._arrays.move_to_end(key)
+        return self._arrays[key]
+
+    def put(self, key : str, points : np.ndarray) -> np.ndarray:
+        points = readonly(points)
+        self.discard(key) # The previous value is stale even if the new one is not kept
+        if points.nbytes > self.max_bytes: # Would evict everything and still not fit
+            return points
+
+        self._arrays[key] = points
+        self.nbytes += points.nbytes
+
+        # Evict least recently used arrays
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._arrays.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+        return points
+
+    def get_or_compute(self, key : str, compute : Callable[[],np.ndarray]) -> np.ndarray:
+        points = self.get(key)
+        return self.put(key, compute()) if points is None else points
+
+    def discard(self, key : str):
+        if key in self._arrays:
+            self.nbytes -= self._arrays.pop(key).nbytes
+
+    def clear(self):
+        self._arrays.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, entries=len(self._arrays), nbytes=self.nbytes, max_bytes=self.max_bytes)
+
+    def __contains__(self, key : str) -> bool:
+        return key in self._arrays
+
+    def __len__(self) -> int:
+        return len(self._arrays)
+
+
+class DiskMeshStore:
+    # Bump when the meaning of stored arrays changes, so that stale files are not reused
+    format_version = 1
+
+    def __init__(self, directory : str, max_bytes : int = 2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key : str) -> np.ndarray:
+        path = self._path(key)
+        try:
+            points = np.load(path, mmap_mode="r") # Only the header is read until the points are used
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path) # Mark as recently used
+        except FileNotFoundError: # Evicted by a concurrent run since it was opened
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return points
+
+    def put(self, key : str, points : np.ndarray) -> np.ndarray:
+        points = readonly(points)
+        path = self._path(key)
+        if points.nbytes > self.max_bytes:
+            self._remove(path) # The previous value is stale even if the new one is not kept
+            return points
+
+        # Write then rename, so that concurrent runs never load a partial file
+        temp_path = "{}.{}.tmp".format(path,os.getpid())
+        try:
+            with open(temp_path,"wb") as f: np.save(f, points, allow_pickle=False)
+            os.replace(temp_path, path)
+        except (OSError, ValueError):
+            if os.path.exists(temp_path): os.remove(temp_path)
+            return points
+
+        self._evict(keep=path)
+        return points
+
+    def get_or_compute(self, key : str, compute : Callable[[],np.ndarray]) -> np.ndarray:
+        points = self.get(key)
+        return self.put(key, compute()) if points is None else points
+
+    def clear(self):
+        for path, _, _ in self._entries(): os.remove(path)
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, entries=len(entries), nbytes=sum(e[2] for e in entries), max_bytes=self.max_bytes)
+
+    def __contains__(self, key : str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def _path(self, key : str) -> str:
+        # Arrays computed by other library versions are never reused
+        import scipy
+        return os.path.join(self.directory, hash_key(key, self.format_version, np.__version__, scipy.__version__) + ".npy")
+
+    def _entries(self) -> list[tuple[str,float,int]]:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_mtime, stat.st_size))
+                except FileNotFoundError: # Removed by a concurrent run
+                    pass
+        return entries
+
+    def _evict(self, keep : str = None):
+        # Remove least recently used files until the directory fits the budget
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        nbytes = sum(e[2] for e in entries)
+
+        for path, _, size in entries:
+            if nbytes <= self.max_bytes: break
+            if path == keep: continue
+
+            if self._remove(path): self.evictions += 1
+            nbytes -= size
+
+    def _remove(self, path : str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError: # Removed by a concurrent run
+            return False
+
+        return True
+
+
+def readonly(points : np.ndarray) -> np.ndarray:
+    # Cached arrays are handed out without copying, so they must not be modified by consumers
+    points = np.asarray(points)
+    if points.flags.writeable:
+        points = points.view()
+        points.flags.writeable = False
+
+    return points
+
+# Process-wide store shared by default between meshes and facades
+default_mesh_store = MeshStore()
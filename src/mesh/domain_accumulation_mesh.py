@@ -1,4 +1,5 @@
 from .domain_mesh import DomainMesh, WrappedDomainMesh
+from ..profiling import profile_stage
 
 import numpy as np
 import numpy.typing as npt
@@ -6,6 +7,7 @@ import numpy.typing as npt
 import scipy.stats
 
 import collections.abc as abc
+import functools
 
 class DomainAccumulationMesh(WrappedDomainMesh):
     def __init__(self, 
@@ -22,10 +24,14 @@ class DomainAccumulationMesh(WrappedDomainMesh):
 
     def __sample_alpha_beta(self) -> tuple[np.ndarray,np.ndarray]:
         alpha_mesh, beta_mesh = self.__sample_alpha_beta()
-        alpha_mesh, beta_mesh = self._accumulate_parameter(alpha_mesh, beta_mesh)
+        with profile_stage("parameter_accumulation"):
+            alpha_mesh, beta_mesh = self._accumulate_parameter(alpha_mesh, beta_mesh)
 
         return alpha_mesh, beta_mesh
 
+    def _points_at(self, alpha : np.ndarray, beta : np.ndarray) -> np.ndarray:
+        return self.base_domain_mesh._points_at(*self._accumulate_parameter(alpha, beta))
+
     def _accumulate_parameter(self, alpha_mesh : np.ndarray, beta_mesh: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
         raise NotImplementedError()
 
@@ -33,27 +39,69 @@ class DomainAccumulationMesh(WrappedDomainMesh):
 class DomainBetaAccumulationMesh(DomainAccumulationMesh):
 
     class MixtureOfBetas(scipy.stats.rv_continuous):
-        def __init__(self, beta_params : abc.Sequence[tuple[float,float]], *, beta_weights : float | npt.ArrayLike = 1, uniform_weight : float = 1):
+        def __init__(self, beta_params : abc.Sequence[tuple[float,float]], *, beta_weights : float | npt.ArrayLike = 1, uniform_weight : float = 1,
+                     table_size : int = 1025, newton_steps : int = 2):
             scipy.stats.rv_continuous.__init__(self,a=0,b=1)
 
-            self.beta_params = np.asarray(beta_params)
+            self.beta_params = np.asarray(beta_params, dtype=float).reshape((-1,2))
             self.beta_weights = np.asarray(beta_weights)
             self.uniform_weight = uniform_weight
 
+            self.table_size = table_size
+            self.newton_steps = newton_steps
+
+            # Normalized mixture weights, last one belongs to the uniform component
+            weights = np.full(self.beta_params.shape[0],self.beta_weights) if not self.beta_weights.shape else self.beta_weights
+            weights = np.asarray([*weights,self.uniform_weight],dtype=float)
+            self._weights = weights/np.sum(weights)
+
+            self._quantile_table : tuple[np.ndarray,np.ndarray] = None
+
         def _cdf(self, x, *args):
-            cdf = np.asarray([scipy.stats.beta.cdf(x,*ab,*args) for ab in self.beta_params] + [scipy.stats.uniform.cdf(x,*args)])
-            return self._mix(cdf)
-        
+            x = np.asarray(x, dtype=float)
+            cdf = scipy.stats.beta.cdf(x[...,None],self.beta_params[:,0],self.beta_params[:,1])
+            return self._mix(cdf, np.clip(x,0,1))
+
         def _pdf(self, x, *args):
-            pdf = np.asarray([scipy.stats.beta.pdf(x,*ab,*args) for ab in self.beta_params] + [scipy.stats.uniform.pdf(x,*args)])
-            return self._mix(pdf)
-            
-        def _mix(self,vals):
-            weights = np.full(self.beta_params.shape[0],self.beta_weights) if not self.beta_weights.shape else self.beta_weights
-            weights = np.asarray([*weights,self.uniform_weight])
+            x = np.asarray(x, dtype=float)
+            pdf = scipy.stats.beta.pdf(x[...,None],self.beta_params[:,0],self.beta_params[:,1])
+            return self._mix(pdf, ((x >= 0) & (x <= 1)).astype(float))
+
+        def _ppf(self, q, *args):
+            q = np.asarray(q, dtype=float)
+            if not self.beta_params.shape[0]: return q # Only the uniform component
 
-            avg = np.average(vals,axis=0,weights=weights)
-            return avg
+            # Initial guess from the lookup table
+            q_table, x_table = self._get_quantile_table()
+            x = np.interp(q,q_table,x_table)
+
+            # Bracket guess between table nodes to keep Newton steps safe
+            idx = np.clip(np.searchsorted(q_table,q),1,q_table.size-1)
+            lower, upper = x_table[idx-1], x_table[idx]
+
+            for _ in range(self.newton_steps):
+                pdf = self._pdf(x)
+                step = np.divide(self._cdf(x)-q, pdf, out=np.zeros_like(x), where=(pdf > 0) & np.isfinite(pdf))
+                x = np.clip(x-step,lower,upper)
+
+            return x
+
+        def _mix(self, vals, uniform_vals):
+            return vals @ self._weights[:-1] + uniform_vals*self._weights[-1]
+
+        def _get_quantile_table(self) -> tuple[np.ndarray,np.ndarray]:
+            if self._quantile_table is None:
+                # Nodes are spread uniformly and along each component's quantiles, so that sharp components are well resolved
+                q_nodes = np.linspace(0,1,self.table_size)
+                x_table = np.concatenate((q_nodes,scipy.stats.beta.ppf(q_nodes[:,None],self.beta_params[:,0],self.beta_params[:,1]).ravel()))
+                x_table = np.unique(np.clip(x_table,0,1))
+
+                q_table = np.maximum.accumulate(self._cdf(x_table)) # Enforce monotonicity
+                q_table[0], q_table[-1] = 0, 1
+
+                self._quantile_table = q_table, x_table
+
+            return self._quantile_table
 
     def __init__(self, 
             base_domain_mesh : DomainMesh,
@@ -74,6 +122,13 @@ class DomainBetaAccumulationMesh(DomainAccumulationMesh):
         self.rv_beta = self._build_rv(self.beta_accumulate_values,beta_concentration)
 
     def _build_rv(self, accumulate_val : np.ndarray, concentration : float):
+        # Mixtures (and their quantile tables) are shared between meshes with the same accumulation setup
+        return DomainBetaAccumulationMesh._build_cached_rv(tuple(accumulate_val.ravel().tolist()),float(concentration))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _build_cached_rv(accumulate_val : tuple[float,...], concentration : float):
+        accumulate_val = np.asarray(accumulate_val, dtype=float)
         if not accumulate_val.size:
             return DomainBetaAccumulationMesh.MixtureOfBetas([])
 
@@ -92,7 +147,7 @@ class DomainBetaAccumulationMesh(DomainAccumulationMesh):
         return mixture_rv
 
     def _accumulate_parameter(self, alpha_mesh : np.ndarray, beta_mesh: np.ndarray) -> tuple[np.ndarray,np.ndarray]:            
-        alpha_mesh = self.rv_alpha.ppf(alpha_mesh)
-        beta_mesh = self.rv_beta.ppf(beta_mesh)
+        alpha_mesh = self.rv_alpha.ppf(alpha_mesh).astype(alpha_mesh.dtype, copy=False)
+        beta_mesh = self.rv_beta.ppf(beta_mesh).astype(beta_mesh.dtype, copy=False)
 
         return alpha_mesh, beta_mesh
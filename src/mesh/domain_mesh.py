@@ -1,49 +1,80 @@
-from .mesh import TransformableMesh, WrappedMesh
+from .mesh import Mesh, MeshTile, TransformableMesh, WrappedMesh, evaluate_shared, tile_slices
 from ..domain.domain import Domain
+from ..profiling import profile_stage
 
 import numpy as np
+import numpy.typing as npt
 
-from typing import Tuple
+from typing import Callable, Iterator, List, Tuple
 
 class DomainMesh(TransformableMesh):
     def __init__(self, 
                  domain : Domain,
                  alpha_resolution : int,
-                 beta_resolution : int):
+                 beta_resolution : int,
+                 *,
+                 dtype : npt.DTypeLike = np.complex128):
 
         self.domain =  domain
         self.alpha_resolution = alpha_resolution
         self.beta_resolution = beta_resolution
 
+        # Precision of the mesh points, parameters are sampled with the matching real type
+        self.dtype = np.dtype(dtype)
+        self.real_dtype = np.finfo(self.dtype).dtype
+
     def get_mesh_points(self):
-        return self.domain.get_points(*self._sample_alpha_beta())
+        return evaluate_shared(self, self._get_domain_points)
+
+    def _get_domain_points(self) -> np.ndarray:
+        with profile_stage("domain") as stage:
+            points = self.domain.get_points(*self._sample_alpha_beta())
+            stage.record_points(points)
+
+        return points
+
+    def iter_mesh_tiles(self, tile_shape : Tuple[int,int]) -> Iterator[MeshTile]:
+        # Parameters are sampled once so that all tiles belong to the same mesh
+        alpha_mesh, beta_mesh = self._sample_alpha_beta()
+        for alpha_slice, beta_slice in tile_slices((alpha_mesh.size,beta_mesh.size),tile_shape):
+            yield (alpha_slice,beta_slice), self.domain.get_points(alpha_mesh[alpha_slice],beta_mesh[beta_slice])
     
     def _sample_alpha_beta(self) -> Tuple[np.ndarray,np.ndarray]:
         raise NotImplementedError()
 
+    def _points_at(self, alpha : np.ndarray, beta : np.ndarray) -> np.ndarray:
+        # Points of this mesh for sampled (not yet accumulated) parameters
+        return self.domain.get_points(alpha, beta)
+
 class WrappedDomainMesh(DomainMesh):
     def __init__(self, base_domain_mesh : DomainMesh):
         self.base_domain_mesh = base_domain_mesh
         DomainMesh.__init__(self, 
             base_domain_mesh.domain,
             base_domain_mesh.alpha_resolution,
-            base_domain_mesh.beta_resolution)
+            base_domain_mesh.beta_resolution,
+            dtype=base_domain_mesh.dtype)
         WrappedMesh.__init__(self,base_domain_mesh)
 
     def _sample_alpha_beta(self) -> Tuple[np.ndarray,np.ndarray]:
         return self.base_domain_mesh._sample_alpha_beta()
 
+    def _points_at(self, alpha : np.ndarray, beta : np.ndarray) -> np.ndarray:
+        return self.base_domain_mesh._points_at(alpha, beta)
+
 class LinearSamplingDomainMesh(DomainMesh):
     def __init__(self, 
                  domain : Domain,
                  alpha_resolution : int,
-                 beta_resolution : int):
+                 beta_resolution : int,
+                 *,
+                 dtype : npt.DTypeLike = np.complex128):
 
-        DomainMesh.__init__(self,domain,alpha_resolution,beta_resolution)
+        DomainMesh.__init__(self,domain,alpha_resolution,beta_resolution,dtype=dtype)
 
     def _sample_alpha_beta(self) -> Tuple[np.ndarray,np.ndarray]:
-        alpha_mesh = np.linspace(0,1,self.alpha_resolution)
-        beta_mesh = np.linspace(0,1,self.beta_resolution)
+        alpha_mesh = np.linspace(0,1,self.alpha_resolution,dtype=self.real_dtype)
+        beta_mesh = np.linspace(0,1,self.beta_resolution,dtype=self.real_dtype)
         
         return alpha_mesh, beta_mesh
     
@@ -51,14 +82,188 @@ class RandomSamplingDomainMesh(DomainMesh):
     def __init__(self, 
                  domain : Domain,
                  alpha_resolution : int,
-                 beta_resolution : int):
+                 beta_resolution : int,
+                 *,
+                 dtype : npt.DTypeLike = np.complex128,
+                 seed : int = None):
+
+        DomainMesh.__init__(self,domain,alpha_resolution,beta_resolution,dtype=dtype)
 
-        DomainMesh.__init__(self,domain,alpha_resolution,beta_resolution)
+        # Without a seed one is drawn, every use of the mesh still shares the same samples
+        self.seed = np.random.SeedSequence().entropy if seed is None else seed
 
     def _sample_alpha_beta(self) -> Tuple[np.ndarray,np.ndarray]:
-        alpha_mesh = np.sort(np.random.random(size=self.alpha_resolution))
-        beta_mesh = np.sort(np.random.random(size=self.beta_resolution))
+        # Independent streams for both parameters, derived from the seed
+        alpha_rng, beta_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(self.seed).spawn(2))
+
+        alpha_mesh = np.sort(self._draw(alpha_rng,self.alpha_resolution)).astype(self.real_dtype)
+        beta_mesh = np.sort(self._draw(beta_rng,self.beta_resolution)).astype(self.real_dtype)
         
         return alpha_mesh, beta_mesh
+
+    def _draw(self, rng : np.random.Generator, size : int) -> np.ndarray:
+        return rng.random(size)
+
+class QuasiRandomSamplingDomainMesh(RandomSamplingDomainMesh):
+    def __init__(self, 
+                 domain : Domain,
+                 alpha_resolution : int,
+                 beta_resolution : int,
+                 *,
+                 dtype : npt.DTypeLike = np.complex128,
+                 seed : int = None,
+                 sequence : str = "sobol"):
+
+        # Scrambled low-discrepancy sequences cover the parameter range evenly with fewer samples than independent draws
+        RandomSamplingDomainMesh.__init__(self,domain,alpha_resolution,beta_resolution,dtype=dtype,seed=seed)
+        self.sequence = sequence.lower()
+
+        if self.sequence not in ("sobol","halton"):
+            raise ValueError("""Argument "sequence" ({}) not valid, value must be "sobol" or "halton".""".format(self.sequence))
+
+    def _draw(self, rng : np.random.Generator, size : int) -> np.ndarray:
+        import scipy.stats.qmc
+
+        match self.sequence:
+            # Sobol points are balanced in blocks of powers of 2, the first size points of the block are used
+            case "sobol": return scipy.stats.qmc.Sobol(1,rng=rng).random_base2(int(np.ceil(np.log2(max(size,1)))))[:size,0]
+            case "halton": return scipy.stats.qmc.Halton(1,rng=rng).random(size)[:,0]
     
 
+class AdaptiveSamplingDomainMesh(DomainMesh):
+    def __init__(self, 
+                 domain : Domain,
+                 alpha_resolution : int,
+                 beta_resolution : int,
+                 *,
+                 dtype : npt.DTypeLike = np.complex128,
+                 transformations : List[Callable] = None,
+                 max_points : int = 2**16,
+                 max_distance : float = 0.05,
+                 max_angle : float = 10,
+                 max_depth : int = 8,
+                 extent : float = None):
+
+        # Starting from a uniform alpha_resolution x beta_resolution grid, alpha and beta lines are inserted where the
+        # transformed mesh is coarse: neighbouring points further apart than max_distance or grid-lines turning by more than max_angle degrees.
+        # With an extent, only the part of the mesh inside [-extent,extent]^2 is refined
+        DomainMesh.__init__(self,domain,alpha_resolution,beta_resolution,dtype=dtype)
+
+        # Mesh wrapping this one whose points are refined, so that parameter and point accumulation are accounted for
+        self.points_mesh : Mesh = self
+
+        self.transformations = list(transformations or [])
+        self.max_points = max_points
+        self.max_distance = max_distance
+        self.max_angle = max_angle
+        self.max_depth = max_depth
+        self.extent = extent
+
+        self._alpha_beta : Tuple[np.ndarray,np.ndarray] = None
+
+    def _sample_alpha_beta(self) -> Tuple[np.ndarray,np.ndarray]:
+        # Refined once, every use of the mesh shares the same parameters
+        if self._alpha_beta is None:
+            with profile_stage("adaptive_refinement"):
+                self._alpha_beta = self._refine(
+                    np.linspace(0,1,self.alpha_resolution,dtype=self.real_dtype),
+                    np.linspace(0,1,self.beta_resolution,dtype=self.real_dtype))
+
+        return self._alpha_beta
+
+    def _refine(self, alpha : np.ndarray, beta : np.ndarray) -> Tuple[np.ndarray,np.ndarray]:
+        min_width = (1/max(self.alpha_resolution-1,1)/2**self.max_depth, 1/max(self.beta_resolution-1,1)/2**self.max_depth)
+        points = self._evaluate(alpha, beta)
+
+        while alpha.size*beta.size < self.max_points:
+            # Worst coarseness of each parameter interval over all the grid-lines crossing it
+            scores, axes, midpoints = [], [], []
+            for axis, parameters in enumerate((alpha,beta)):
+                score = self._get_interval_scores(points, axis)
+                candidate = (score > 1) & (np.diff(parameters) > min_width[axis])
+
+                scores.append(score[candidate])
+                axes.append(np.full(np.count_nonzero(candidate), axis))
+                midpoints.append(((parameters[:-1]+parameters[1:])/2)[candidate])
+            if not sum(map(np.size, scores)): break
+
+            # Most distorted intervals first, as long as the grid fits the point budget
+            order = np.argsort(-np.concatenate(scores), kind="stable")
+            axes, midpoints = np.concatenate(axes)[order], np.concatenate(midpoints)[order]
+
+            # Once a line does not fit, neither does any later line along the same axis
+            accepted = np.ones(order.size, dtype=bool)
+            while True:
+                counts = np.cumsum(np.stack((axes == 0, axes == 1)) & accepted, axis=1)
+                rejected = np.flatnonzero(accepted & ((alpha.size+counts[0])*(beta.size+counts[1]) > self.max_points))
+                if not rejected.size: break
+                accepted[rejected[0]:] &= axes[rejected[0]:] != axes[rejected[0]]
+
+            new_parameters = tuple(midpoints[accepted & (axes == axis)] for axis in (0,1))
+            if not new_parameters[0].size and not new_parameters[1].size: break
+
+            # Only the inserted lines are evaluated
+            new_alpha, new_beta = (p.astype(self.real_dtype) for p in new_parameters)
+            if new_alpha.size:
+                points = np.concatenate((points, self._evaluate(new_alpha, beta)), axis=0)
+                alpha = np.concatenate((alpha, new_alpha))
+            if new_beta.size:
+                points = np.concatenate((points, self._evaluate(alpha, new_beta)), axis=1)
+                beta = np.concatenate((beta, new_beta))
+
+            alpha_order, beta_order = np.argsort(alpha), np.argsort(beta)
+            alpha, beta, points = alpha[alpha_order], beta[beta_order], points[alpha_order][:,beta_order]
+
+        return alpha, beta
+
+    def _evaluate(self, alpha : np.ndarray, beta : np.ndarray) -> np.ndarray:
+        with np.errstate(all="ignore"):
+            points = self.points_mesh._points_at(alpha, beta)
+            for t in self.transformations:
+                points = t(points)
+
+        return np.broadcast_to(points, (alpha.size,beta.size))
+
+    def _get_interval_scores(self, points : np.ndarray, axis : int) -> np.ndarray:
+        # Coarseness of every interval along the axis relative to the limits, intervals scoring above 1 are refined
+        steps = np.moveaxis(np.diff(points, axis=axis), axis, 0)
+        with np.errstate(all="ignore"):
+            distance = np.abs(steps)
+
+            # Turning angle at both ends of every interval, only counted on intervals that are not already negligible
+            turn = np.degrees(np.abs(np.angle(steps[1:]/steps[:-1])))
+            turn = np.maximum(np.pad(turn,((1,0),(0,0))), np.pad(turn,((0,1),(0,0))))
+
+            score = np.maximum(distance/self.max_distance, np.where(distance > self.max_distance/8, turn/self.max_angle, 0))
+
+            if self.extent is not None:
+                outside = np.moveaxis(np.maximum(np.abs(points.real),np.abs(points.imag)) > self.extent, axis, 0)
+                score[outside[1:] & outside[:-1]] = 0
+
+        # Poles and overflows are not resolved by refinement
+        return np.max(np.where(np.isfinite(score), score, 0), axis=1, initial=0)
+
+class GridLineDomainMesh(WrappedDomainMesh):
+    def __init__(self, base_domain_mesh : DomainMesh, line_samples : int, axis : int):
+        # Grid-lines along one parameter (0 for alpha, 1 for beta) sampled with about line_samples points each,
+        # the parameters of the base mesh are kept every step samples so that grid-lines still meet at the base mesh-points
+        WrappedDomainMesh.__init__(self,base_domain_mesh)
+        self._sample_alpha_beta, self.__sample_alpha_beta = self.__sample_alpha_beta, self._sample_alpha_beta
+
+        self.line_samples = line_samples
+        self.axis = axis
+
+        resolution = (self.alpha_resolution,self.beta_resolution)[axis]
+        self.step = max(int(np.ceil((line_samples-1)/max(resolution-1,1))),1)
+
+    def __sample_alpha_beta(self) -> Tuple[np.ndarray,np.ndarray]:
+        parameters = list(self.__sample_alpha_beta())
+        base = parameters[self.axis]
+
+        # Linear subdivision of every interval between base parameters
+        t = np.arange(self.step)/self.step
+        dense = (base[:-1,None]*(1-t) + base[1:,None]*t).ravel()
+        parameters[self.axis] = np.append(dense, base[-1:]).astype(base.dtype)
+
+        return tuple(parameters)
+
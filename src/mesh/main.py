@@ -1,10 +1,12 @@
 from ..domain.domain import Domain, ComplexDomain
 
-from .mesh import ComplexMesh, CachedMesh, ComplexToMesh2D
-from .domain_mesh import LinearSamplingDomainMesh, RandomSamplingDomainMesh
-from .domain_accumulation_mesh import DomainBetaAccumulationMesh
+from .mesh import ComplexMesh, CachedMesh, ComplexToMesh2D, TransformedMesh
+from .cache import MeshStore
+from .parallel import ParallelEvaluator
+from .domain_mesh import LinearSamplingDomainMesh, RandomSamplingDomainMesh, QuasiRandomSamplingDomainMesh, AdaptiveSamplingDomainMesh, GridLineDomainMesh
 from .accumulation_mesh import GaussianAccumulationMesh
 
+import numpy as np
 import numpy.typing as npt
 
 from typing import List, Callable
@@ -15,34 +17,49 @@ def build_domain_mesh(
         beta_resolution : int,
         *,
         sampling_method : str = "uniform",
+        sampling_args : dict = None,
+        dtype : npt.DTypeLike = np.complex128,
         alpha_accumulate_values : npt.ArrayLike = None,
         beta_accumulate_values : npt.ArrayLike = None,
         parameter_accumulation_method : str = "beta",
         parameter_accumulation_args : dict = None,
+        line_samples : int = None,
+        line_axis : int = 0,
         mesh_accumulate_points : npt.ArrayLike = None,
         mesh_accumulate_method : str = "gaussian",
         mesh_accumulate_args : dict = None,
         transformations : List[Callable] = None,
         use_cache : bool = False,
+        cache_store : MeshStore = None,
+        cache_key : str = None,
+        workers : int = 1,
+        worker_pool : str = "thread",
+        evaluator : ParallelEvaluator = None,
         ):
 
     # Get base class
     match sampling_method.lower():
         case "uniform": mesh_base_class = LinearSamplingDomainMesh
         case "random": mesh_base_class = RandomSamplingDomainMesh
-        case _: raise ValueError("""The allowed sampling methods are: "uniform" and "random".""")
+        case "sobol" | "halton":
+            mesh_base_class = QuasiRandomSamplingDomainMesh
+            sampling_args = dict(sampling_args or dict(), sequence=sampling_method.lower())
+        case "adaptive": mesh_base_class = AdaptiveSamplingDomainMesh
+        case _: raise ValueError("""The allowed sampling methods are: "uniform", "random", "sobol", "halton" and "adaptive".""")
 
     if isinstance(domain,ComplexDomain):
         mesh_base_class = type("Complex{}".format(mesh_base_class.__name__),(ComplexMesh,mesh_base_class),dict())
 
     # Instantiate Mesh
-    domain_mesh = mesh_base_class(domain,alpha_resolution,beta_resolution)
+    sampling_args = sampling_args or dict()
+    domain_mesh = base_mesh = mesh_base_class(domain,alpha_resolution,beta_resolution,dtype=dtype,**sampling_args)
 
 
     if alpha_accumulate_values is not None or beta_accumulate_values is not None:
         parameter_accumulation_args = parameter_accumulation_args or dict()
         match parameter_accumulation_method.lower():
             case "beta":
+                from .domain_accumulation_mesh import DomainBetaAccumulationMesh # Deferred, scipy.stats is slow to import
                 domain_mesh = DomainBetaAccumulationMesh(domain_mesh,
                     alpha_accumulate_values=alpha_accumulate_values,
                     beta_accumulate_values=beta_accumulate_values,
@@ -50,6 +67,10 @@ def build_domain_mesh(
 
             case _: raise ValueError("""The allowed parameter accumuation methods are: "beta".""")
 
+    # Grid-lines along one parameter sampled independently of the number of grid-lines
+    if line_samples:
+        domain_mesh = GridLineDomainMesh(domain_mesh, line_samples, line_axis)
+
     if mesh_accumulate_points is not None:
         mesh_accumulate_args = mesh_accumulate_args or dict()
         match mesh_accumulate_method.lower():
@@ -59,11 +80,19 @@ def build_domain_mesh(
 
             case _: raise ValueError("""The allowed mesh accumuation methods are: "gaussian".""")
 
-    if transformations is not None:
-        domain_mesh = domain_mesh.transfom_mesh(transformations)
+    # Adaptive sampling refines where the accumulated mesh is coarse, not the mesh it samples
+    if isinstance(base_mesh, AdaptiveSamplingDomainMesh):
+        base_mesh.points_mesh = domain_mesh
+
+    # Parallel evaluation is inherited by the meshes obtained from this one through transfom_mesh
+    if evaluator is None and workers != 1:
+        evaluator = ParallelEvaluator(workers,pool=worker_pool)
+
+    if transformations is not None or evaluator is not None:
+        domain_mesh = TransformedMesh(domain_mesh,transformations,evaluator=evaluator)
 
     if use_cache:
-        domain_mesh = CachedMesh(domain_mesh)
+        domain_mesh = CachedMesh(domain_mesh,store=cache_store,key=cache_key)
 
 
 
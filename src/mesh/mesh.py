@@ -1,13 +1,60 @@
 import numpy as np
 import numpy.typing as npt
-from scipy.stats import beta
 
-from typing import List, Callable
+from .cache import MeshStore, readonly
+from .parallel import ParallelEvaluator
+from ..profiling import profile_stage
+from ..mapping import fuse_mappings
+
+import contextlib
+import warnings
+
+from typing import List, Callable, Iterator, Tuple
+
+class PrecisionWarning(RuntimeWarning): pass
+
+def is_single_precision(points : np.ndarray) -> bool:
+    return isinstance(points,np.ndarray) and points.dtype in (np.complex64, np.float32)
+
+# A tile is the (alpha, beta) index block it covers in the full mesh and its points
+MeshTile = Tuple[Tuple[slice,slice],np.ndarray]
+
+def tile_slices(shape : Tuple[int,int], tile_shape : Tuple[int,int]) -> Iterator[Tuple[slice,slice]]:
+    # Consecutive tiles share one row/column so that every grid-line segment lies fully inside a tile
+    alpha_step, beta_step = (s if t is None else max(int(t),1) for s, t in zip(shape,tile_shape))
+
+    for alpha_start in range(0,max(shape[0]-1,1),alpha_step):
+        for beta_start in range(0,max(shape[1]-1,1),beta_step):
+            yield slice(alpha_start,min(alpha_start+alpha_step+1,shape[0])), slice(beta_start,min(beta_start+beta_step+1,shape[1]))
+
+# Within a shared evaluation scope every mesh materializes its points at most once
+_evaluation_scopes : List[dict] = []
+
+@contextlib.contextmanager
+def shared_evaluation():
+    _evaluation_scopes.append(dict())
+    try:
+        yield
+    finally:
+        _evaluation_scopes.pop()
+
+def evaluate_shared(mesh : "Mesh", evaluate : Callable[[],np.ndarray]) -> np.ndarray:
+    if not _evaluation_scopes:
+        return evaluate()
+
+    scope = _evaluation_scopes[-1]
+    if id(mesh) not in scope:
+        points = evaluate()
+        if isinstance(points,np.ndarray): points.flags.writeable = False # Shared between consumers
+        scope[id(mesh)] = mesh, points # Holding the mesh keeps its id unique within the scope
+
+    return scope[id(mesh)][1]
 
 # Base classes
 class Mesh:
     # API
     def get_mesh_points(self) -> np.ndarray: raise NotImplementedError()
+    def iter_mesh_tiles(self, tile_shape : Tuple[int,int]) -> Iterator[MeshTile]: raise NotImplementedError()
     def transfom_mesh(self, transformations : List[Callable]) -> "Mesh": raise NotImplementedError()
 
     # helper methods that might be needed for some implementations
@@ -19,7 +66,7 @@ class ComplexMesh(Mesh):
 
 class Mesh2D(Mesh):
     def _point_norm(self, points : np.ndarray):
-        return np.sqrt(points[:,:,0]**2 + points[:,:,1]**2)
+        return np.hypot(points[...,0], points[...,1])
 
 class WrappedMesh(Mesh):
     def __init__(self, base_mesh : Mesh):
@@ -27,6 +74,9 @@ class WrappedMesh(Mesh):
 
     def get_mesh_points(self):
         return self.base_mesh.get_mesh_points()
+
+    def iter_mesh_tiles(self, tile_shape : Tuple[int,int]) -> Iterator[MeshTile]:
+        return self.base_mesh.iter_mesh_tiles(tile_shape)
     
     def transfom_mesh(self, transformations : List[Callable]) -> Mesh:
         return self.base_mesh.transfom_mesh(transformations)
@@ -35,44 +85,121 @@ class WrappedMesh(Mesh):
         return self.base_mesh._point_norm(points)
 
 class TransformedMesh(WrappedMesh):
-    def __init__(self, base_mesh : Mesh, transformations : List[Callable] = None):
+    evaluator : ParallelEvaluator = None
+
+    def __init__(self, base_mesh : Mesh, transformations : List[Callable] = None, *, evaluator : ParallelEvaluator = None):
         WrappedMesh.__init__(self,base_mesh)
         self.get_mesh_points, self.__get_mesh_points = self.__get_mesh_points, self.get_mesh_points
+        self.iter_mesh_tiles, self.__iter_mesh_tiles = self.__iter_mesh_tiles, self.iter_mesh_tiles
 
         self.transformations = list() if transformations is None else list(transformations)
+        self.evaluator = evaluator
 
     def __get_mesh_points(self):
-        mesh_points = self.__get_mesh_points()
-        
-        for t in self.transformations:
-            mesh_points = t(mesh_points)
+        return evaluate_shared(self, lambda: self._transform_points(self.__get_mesh_points()))
+
+    def __iter_mesh_tiles(self, tile_shape : Tuple[int,int]) -> Iterator[MeshTile]:
+        transformations = fuse_mappings(self.transformations)
+        for index, tile in self.__iter_mesh_tiles(tile_shape):
+            yield index, self._transform_points(tile, transformations)
+
+    def _transform_points(self, mesh_points : np.ndarray, transformations : List[Callable] = None) -> np.ndarray:
+        transformations = fuse_mappings(self.transformations) if transformations is None else transformations
 
-        return mesh_points
+        with profile_stage("mappings") as stage:
+            if self.evaluator is not None:
+                transformed_points = self.evaluator.apply(transformations, mesh_points)
+            else:
+                transformed_points = mesh_points
+                for t in transformations:
+                    transformed_points = t(transformed_points)
+
+            if is_single_precision(mesh_points):
+                transformed_points = self._check_precision(mesh_points, transformed_points, transformations)
+
+            stage.record_points(transformed_points)
+
+        return transformed_points
+
+    def _check_precision(self, mesh_points : np.ndarray, transformed_points : np.ndarray, transformations : List[Callable]) -> np.ndarray:
+        # Keep single precision meshes in single precision (e.g. numpy float64 constants upcast the result)
+        transformed_points = np.asarray(transformed_points)
+        if transformed_points.dtype.kind in "fc":
+            transformed_points = transformed_points.astype(np.complex64 if transformed_points.dtype.kind == "c" else np.float32, copy=False)
+
+        if transformed_points.shape != mesh_points.shape:
+            return transformed_points
+
+        # Points that only become infinite or nan in single precision
+        lost = np.isfinite(mesh_points) & ~np.isfinite(transformed_points)
+        if np.any(lost):
+            reference_points = mesh_points[lost].astype(np.complex128 if mesh_points.dtype.kind == "c" else np.float64)
+            for t in transformations:
+                reference_points = t(reference_points)
+
+            overflowed = np.count_nonzero(np.isfinite(reference_points))
+            if overflowed:
+                warnings.warn("{} of {} mesh points overflowed in single precision, use double precision to keep them.".format(overflowed,mesh_points.size),
+                    PrecisionWarning, stacklevel=2)
+
+        return transformed_points
     
     def transfom_mesh(self, transformations : List[Callable]) -> Mesh:
-        return TransformedMesh(self,transformations)
+        return TransformedMesh(self,transformations,evaluator=self.evaluator)
     
 class CachedMesh(WrappedMesh):
-    def __init__(self, base_mesh : Mesh):
+    def __init__(self, base_mesh : Mesh, *, store : MeshStore = None, key : str = None):
         WrappedMesh.__init__(self,base_mesh)
         self.get_mesh_points, self.__get_mesh_points = self.__get_mesh_points, self.get_mesh_points
+        self.iter_mesh_tiles, self.__iter_mesh_tiles = self.__iter_mesh_tiles, self.iter_mesh_tiles
+
+        # Points are kept in the store under key when both are given, otherwise by this mesh alone
+        self.store = store
+        self.key = key
 
         self._mesh_points : np.ndarray = None
 
     def __get_mesh_points(self) -> np.ndarray:
-        if self._mesh_points is None: self._mesh_points = self.__get_mesh_points()
-        return np.copy(self._mesh_points)
+        # Cached points are returned as read-only arrays instead of copies
+        if self.store is not None and self.key is not None:
+            return self.store.get_or_compute(self.key, self.__get_mesh_points)
+
+        if self._mesh_points is None: self._mesh_points = readonly(self.__get_mesh_points())
+        return self._mesh_points
+
+    def __iter_mesh_tiles(self, tile_shape : Tuple[int,int]) -> Iterator[MeshTile]:
+        mesh_points = self._mesh_points if self.store is None or self.key is None or self.key not in self.store else self.store.get(self.key)
+        if mesh_points is None: # Stream from the base mesh instead of filling the cache
+            yield from self.__iter_mesh_tiles(tile_shape)
+            return
+
+        for index in tile_slices(mesh_points.shape[:2],tile_shape):
+            yield index, mesh_points[index]
 
 class ComplexToMesh2D(Mesh2D,WrappedMesh):
     def __init__(self, base_mesh : ComplexMesh):
         WrappedMesh.__init__(self,base_mesh)
         self.transfom_mesh, self.__transfom_mesh = self.__transfom_mesh, self.transfom_mesh
         self.get_mesh_points, self.__get_mesh_points = self.__get_mesh_points, self.get_mesh_points
+        self.iter_mesh_tiles, self.__iter_mesh_tiles = self.__iter_mesh_tiles, self.iter_mesh_tiles
         
     def __get_mesh_points(self):
-        mesh_points = self.__get_mesh_points()
+        return evaluate_shared(self, lambda: self._to_2D(self.__get_mesh_points()))
+
+    def __iter_mesh_tiles(self, tile_shape : Tuple[int,int]) -> Iterator[MeshTile]:
+        for index, tile in self.__iter_mesh_tiles(tile_shape):
+            yield index, self._to_2D(tile)
+
+    def _to_2D(self, mesh_points : np.ndarray) -> np.ndarray:
+        mesh_points = np.asarray(mesh_points)
+
+        # Complex numbers are stored as (real, imag) pairs, so a C-contiguous array is reinterpreted without copying
+        if np.iscomplexobj(mesh_points):
+            mesh_points = np.ascontiguousarray(mesh_points) # Copies only if needed
+            return mesh_points.view(mesh_points.real.dtype).reshape((*mesh_points.shape,2))
+
         real_part, imag_part = np.real(mesh_points), np.imag(mesh_points)
-        return np.stack((real_part,imag_part), axis=2)
+        return np.stack((real_part,imag_part), axis=-1)
 
     def __transfom_mesh(self, transformations : List[Callable]) -> Mesh:
         transformed_mesh = self.__transfom_mesh(transformations)
@@ -0,0 +1,103 @@
+import numpy as np
+
+import concurrent.futures as futures
+
+import os
+
+from typing import List, Callable, Tuple
+
+class ParallelEvaluator:
+    def __init__(self,
+                 workers : int = None,
+                 *,
+                 pool : str = "thread",
+                 min_points : int = 2**16):
+
+        self.workers = os.cpu_count() if workers is None else workers
+        self.pool = pool.lower()
+        self.min_points = min_points
+
+        if self.pool not in ("thread","process"):
+            raise ValueError("""Argument "pool" ({}) not valid, value must be "thread" or "process".""".format(self.pool))
+
+        self._executor : futures.Executor = None
+
+    def apply(self, transformations : List[Callable], points : np.ndarray) -> np.ndarray:
+        # Elementwise transformations applied on row blocks of points, the result matches a serial evaluation bit by bit
+        if self.workers <= 1 or points.ndim == 0 or points.shape[0] < 2 or points.size < self.min_points:
+            return _apply(transformations, points)
+
+        # Probe the output type on a single point
+        probe = np.asarray(_apply(transformations, points.reshape(-1)[:1]))
+        blocks = self._row_blocks(points.shape[0])
+
+        if self.pool == "thread": # Numpy releases the GIL inside ufuncs
+            out = np.empty(points.shape, dtype=probe.dtype)
+
+            def run_block(rows : slice): out[rows] = _apply(transformations, points[rows])
+            list(self._get_executor().map(run_block, blocks))
+
+            return out
+
+        # Process workers read and write the arrays through shared memory instead of pickling them
+        from multiprocessing import shared_memory # Deferred, not every platform provides it (e.g. pyodide)
+
+        points = np.ascontiguousarray(points)
+        in_shm = shared_memory.SharedMemory(create=True, size=max(points.nbytes,1))
+        out_shm = shared_memory.SharedMemory(create=True, size=max(points.size*probe.dtype.itemsize,1))
+        try:
+            np.ndarray(points.shape, dtype=points.dtype, buffer=in_shm.buf)[...] = points
+
+            tasks = [self._get_executor().submit(_apply_shared, transformations,
+                        (in_shm.name, points.dtype.str), (out_shm.name, probe.dtype.str), points.shape, (rows.start, rows.stop)) for rows in blocks]
+            for t in tasks: t.result()
+
+            return np.ndarray(points.shape, dtype=probe.dtype, buffer=out_shm.buf).copy()
+        finally:
+            for shm in (in_shm, out_shm):
+                shm.close()
+                shm.unlink()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self) -> futures.Executor:
+        if self._executor is None:
+            if self.pool == "thread":
+                self._executor = futures.ThreadPoolExecutor(max_workers=self.workers)
+            else:
+                import multiprocessing
+
+                # Forking a process whose thread pools are running (numba, numexpr, BLAS) leaves the children deadlocked,
+                # workers are forked from a server process started without them instead
+                self._executor = futures.ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+
+        return self._executor
+
+    def _row_blocks(self, rows : int) -> List[slice]:
+        bounds = np.linspace(0, rows, min(self.workers,rows)+1).astype(int)
+        return [slice(start,stop) for start, stop in zip(bounds[:-1],bounds[1:])]
+
+
+def _apply(transformations : List[Callable], points : np.ndarray) -> np.ndarray:
+    for t in transformations:
+        points = t(points)
+
+    return points
+
+def _apply_shared(transformations : List[Callable], source : Tuple[str,str], target : Tuple[str,str], shape : Tuple[int,...], rows : Tuple[int,int]):
+    from multiprocessing import shared_memory
+
+    in_shm, out_shm = shared_memory.SharedMemory(name=source[0]), shared_memory.SharedMemory(name=target[0])
+    try:
+        points = np.ndarray(shape, dtype=source[1], buffer=in_shm.buf)
+        out = np.ndarray(shape, dtype=target[1], buffer=out_shm.buf)
+
+        rows = slice(*rows)
+        out[rows] = _apply(transformations, points[rows])
+        del points, out # Release the buffers before closing
+    finally:
+        in_shm.close()
+        out_shm.close()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from typing import NamedTuple
+
+class MeshMask(NamedTuple):
+    # Visible mesh-points (A,B), alpha segments (A-1,B) and beta segments (A,B-1)
+    points : np.ndarray
+    alpha_segments : np.ndarray
+    beta_segments : np.ndarray
+
+    def segments(self, axis : int) -> np.ndarray:
+        return self.beta_segments if axis else self.alpha_segments
+
+
+class ViewportCuller:
+    def __init__(self,*,
+        extent : float | None = 2,
+        max_jump : float = None,
+    ):
+        # Points and segments that cannot show in the window [-extent,extent]^2 are dropped, segments longer than max_jump are cut.
+        # Without an extent only points that are not finite are dropped
+        self.extent = extent
+        self.max_jump = max_jump
+
+    def get_mask(self, points : np.ndarray) -> MeshMask:
+        finite = np.all(np.isfinite(points),axis=-1)
+        # Side of the window each point lies on, per coordinate: -1, 0 (inside) or 1
+        if self.extent is None:
+            side = np.zeros(points.shape, dtype=np.int8)
+        else:
+            with np.errstate(invalid="ignore"):
+                side = np.sign(points) * (np.abs(points) > self.extent)
+
+        return MeshMask(finite & np.all(side == 0,axis=-1), *(self._get_segment_mask(points, finite, side, axis) for axis in (0,1)))
+
+    def _get_segment_mask(self, points : np.ndarray, finite : np.ndarray, side : np.ndarray, axis : int) -> np.ndarray:
+        start, stop = [slice(None)]*2, [slice(None)]*2
+        start[axis], stop[axis] = slice(None,-1), slice(1,None)
+        start, stop = tuple(start), tuple(stop)
+
+        # Segments with both ends past the same edge of the window are fully outside of it
+        mask = finite[start] & finite[stop] & ~np.any((side[start] == side[stop]) & (side[start] != 0),axis=-1)
+
+        # Jumps across branch cuts or poles
+        if self.max_jump:
+            delta = points[stop] - points[start]
+            with np.errstate(invalid="ignore", over="ignore"):
+                mask &= np.hypot(delta[...,0], delta[...,1]) <= self.max_jump
+
+        return mask
@@ -3,9 +3,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection
 from matplotlib.axes import Axes
-from matplotlib.colors import Colormap, hex2color
+from matplotlib.colors import Colormap, Normalize, hex2color
 
-from typing import Union
+import itertools
+
+from .mesh_culling import MeshMask
+
+from typing import Callable, Iterable, Union
 
 class MeshPlotter:
     def __init__(self,*,
@@ -24,45 +28,301 @@ class MeshPlotter:
         if self.paint_parameter not in ("alpha","beta"):
             raise ValueError("""Argument "paint_parameter" ({}) not valid, value must be "alpha" or "beta".""".format(self.paint_parameter))
 
-    def plot_mesh(self, points : np.ndarray, ax : Axes = None):
+    def plot_mesh(self, points : np.ndarray, ax : Axes = None, mask : MeshMask = None):
+        self.plot_grid_lines(points, points, points, ax, None if mask is None else (mask,mask,mask))
+
+    def plot_grid_lines(self, alpha_lines : np.ndarray, beta_lines : np.ndarray, points : np.ndarray, ax : Axes = None, masks : tuple[MeshMask,MeshMask,MeshMask] = None):
+        # Each family of grid-lines is drawn from its own mesh, which may sample the lines more densely than the mesh-points
         
         if ax is None: ax = plt.gca()
+        alpha_mask, beta_mask, points_mask = masks or (None,None,None)
+
+        self._plot_lines(alpha_lines, 0, ax, alpha_mask)
+        self._plot_lines(beta_lines, 1, ax, beta_mask)
+        if self.markersize > 0: self._plot_points(points, ax, points_mask)
+
+    def _plot_lines(self, points : np.ndarray, axis : int, ax : Axes, mask : MeshMask = None):
+        # Painted with the value of the parameter at the segment midpoints
+        segment_mask = None if mask is None else mask.segments(axis).ravel()
+        color_args = self._get_color_args(self.grid_color, lambda: self._get_midpoint_values(self._get_paint_values(points),axis,segment_mask), "array", "color")
+        ax.add_collection(LineCollection(self._get_segments(points,axis,segment_mask), linewidth=self.linewidth, **color_args))
+
+    def _plot_points(self, points : np.ndarray, ax : Axes, mask : MeshMask = None):
+        paint_values = self._get_paint_values(points)
+        if mask is not None: points, paint_values = points[mask.points], paint_values[mask.points]
+
+        color_args = self._get_color_args(self.points_color, lambda: paint_values.ravel(), "c", "c")
+        ax.scatter(points[...,0].ravel(), points[...,1].ravel(), s=self.markersize, zorder=2, **color_args)
+
+    def _get_paint_values(self, mesh : np.ndarray) -> np.ndarray:
+        # Position of each point along the painted parameter, in [0,1]
+        color_dim = int(self.paint_parameter == "beta")
+        values = np.linspace(0,1,mesh.shape[color_dim])
+        return np.broadcast_to(values[None,:] if color_dim else values[:,None], mesh.shape[:2])
+
+    def _get_midpoint_values(self, values : np.ndarray, axis : int, mask : np.ndarray = None) -> np.ndarray:
+        start, stop = [slice(None)]*2, [slice(None)]*2
+        start[axis], stop[axis] = slice(None,-1), slice(1,None)
+        values = ((values[tuple(start)]+values[tuple(stop)])/2).ravel()
+        return values if mask is None else values[mask]
+
+    def _get_segments(self, points : np.ndarray, axis : int, mask : np.ndarray = None) -> Iterable[np.ndarray]:
+        # Segments joining neighbouring points along an axis, as (2,2) views of the points instead of a stacked copy
+        if points.shape[axis] < 2: return []
+        segments = itertools.chain.from_iterable(np.lib.stride_tricks.sliding_window_view(points, 2, axis=axis).swapaxes(-1,-2))
+        return segments if mask is None else itertools.compress(segments, mask)
+
+    def _get_color_args(self, color : Union[str,Colormap], get_values : Callable[[],np.ndarray], values_arg : str, color_arg : str) -> dict:
+        # Colormaps are applied by matplotlib to one scalar per element, fixed colors are never expanded to arrays
+        if isinstance(color, Colormap):
+            return {values_arg: get_values(), "cmap": color, "norm": Normalize(0,1)}
+        return {color_arg: color}
+
+
+class PolylineMeshPlotter(MeshPlotter):
+    def __init__(self,*,
+        extent : float = 2,
+        tolerance : float = 0.25,
+        quantization : float = 0.0625,
+        **kwargs
+    ):
+        # Every grid-line is drawn as a single path, simplified in screen space for a window covering [-extent,extent]^2
+        MeshPlotter.__init__(self,**kwargs)
+
+        self.extent = extent
+        self.tolerance = tolerance
+        self.quantization = quantization
 
-        # Lines
-        alpha_lines = np.stack((points[:-1,:,None],points[1:,:,None]),axis=2).reshape((-1,2,2))
-        beta_lines = np.stack((points[:,:-1,None],points[:,1:,None]),axis=2).reshape((-1,2,2))
+    def _plot_lines(self, points : np.ndarray, axis : int, ax : Axes, mask : MeshMask = None):
+        bbox = ax.get_window_extent()
+        pixels_per_unit = np.array([max(bbox.width,1),max(bbox.height,1)])/(2*self.extent)
 
-        # Compute colors
-        points_color = self._get_color_mesh(self.points_color,points)
-        grid_color = self._get_color_mesh(self.grid_color,points)
+        # Every row is a grid-line, alpha lines run along the first axis of the mesh
+        lines, values = points, self._get_paint_values(points)
+        segment_mask = None if mask is None else mask.segments(axis)
+        if axis == 0: lines, values, segment_mask = lines.swapaxes(0,1), values.T, None if segment_mask is None else segment_mask.T
+        if lines.shape[1] < 2: return
 
-        alpha_color = (grid_color[:-1,:]+grid_color[1:,:])/2 if grid_color.shape[0] > 1 else grid_color
-        beta_color = (grid_color[:,:-1]+grid_color[:,1:])/2 if grid_color.shape[1] > 1 else grid_color
+        # Coordinates are snapped to a sub-pixel grid, so that vertices which end up identical or collinear are merged
+        lines = lines*pixels_per_unit
+        if self.quantization > 0: lines = np.round(lines/self.quantization)*self.quantization
 
-        points_color = points_color.reshape((-1,3))
-        alpha_color = alpha_color.reshape((-1,3))
-        beta_color = beta_color.reshape((-1,3))
+        # Lines are cut into runs of segments sharing the same colormap entry, and around culled segments
+        segment_values = (values[:,:-1]+values[:,1:])/2
+        if segment_mask is None: segment_mask = np.ones(segment_values.shape, dtype=bool)
 
-        # Plot
-        alpha_lines = LineCollection(alpha_lines,color=alpha_color,linewidth=self.linewidth)
-        beta_lines = LineCollection(beta_lines,color=beta_color,linewidth=self.linewidth)
+        breaks = np.zeros(lines.shape[:2], dtype=bool)
+        breaks[:,[0,-1]] = True
+        if isinstance(self.grid_color, Colormap):
+            entries = np.clip((segment_values*self.grid_color.N).astype(np.intp),0,self.grid_color.N-1)
+            breaks[:,1:-1] |= entries[:,1:] != entries[:,:-1]
+        breaks[:,:-1] |= ~segment_mask
+        breaks[:,1:] |= ~segment_mask
 
-        ax.add_collection(alpha_lines)
-        ax.add_collection(beta_lines)
+        keep = self._simplify(lines, breaks)
 
-        ax.scatter(points[:,:,0], points[:,:,1], s=self.markersize, c=points_color, zorder=2)
+        paths, path_values = [], []
+        for line, line_keep, line_breaks, line_values, line_mask in zip(lines/pixels_per_unit, keep, breaks, segment_values, segment_mask):
+            vertices, run_starts = np.flatnonzero(line_keep), np.flatnonzero(line_breaks)[:-1]
+            cuts = np.searchsorted(vertices, np.flatnonzero(line_breaks))
+            visible = line_mask[run_starts]
+            paths.extend(line[vertices[start:stop+1]] for start, stop in zip(cuts[:-1][visible],cuts[1:][visible]))
+            path_values.append(line_values[run_starts[visible]])
 
+        color_args = self._get_color_args(self.grid_color, lambda: np.concatenate(path_values), "array", "color")
+        ax.add_collection(LineCollection(paths, linewidth=self.linewidth, **color_args))
 
-    def _get_color_mesh(self, color : Union[str,Colormap], mesh : np.ndarray) -> np.ndarray:
+    def _simplify(self, lines : np.ndarray, breaks : np.ndarray) -> np.ndarray:
+        # Douglas-Peucker on every line at once, the intervals at the same recursion depth are processed together
+        keep = breaks.copy()
+
+        # Intervals between consecutive breaks of the same line
+        line, vertex = np.nonzero(breaks)
+        same_line = line[1:] == line[:-1]
+        line, start, stop = line[:-1][same_line], vertex[:-1][same_line], vertex[1:][same_line]
+
+        while line.size:
+            interior = stop - start - 1
+            line, start, stop, interior = line[interior > 0], start[interior > 0], stop[interior > 0], interior[interior > 0]
+            if not line.size: break
+
+            owner = np.repeat(np.arange(line.size), interior)
+            first = np.cumsum(interior) - interior
+            vertex = start[owner] + 1 + np.arange(owner.size) - first[owner]
+
+            # Distance of the interior vertices to the chord of their interval
+            a, ab = lines[line,start][owner], (lines[line,stop]-lines[line,start])[owner]
+            p = lines[line[owner],vertex] - a
+            with np.errstate(divide="ignore", invalid="ignore"):
+                length = np.einsum("ij,ij->i",ab,ab)
+                t = np.clip(np.divide(np.einsum("ij,ij->i",p,ab), length, out=np.zeros_like(length), where=length > 0), 0, 1)
+                distance = np.hypot(*(p - t[:,None]*ab).T)
+            distance[~np.isfinite(distance)] = np.inf # Non-finite vertices are never dropped
+
+            # Intervals are split at their farthest vertex until every vertex lies within the tolerance
+            max_distance = np.maximum.reduceat(distance, first)
+            at_max = np.flatnonzero(distance == max_distance[owner])
+            split = vertex[at_max[np.unique(owner[at_max], return_index=True)[1]]]
+
+            split_interval = max_distance > self.tolerance
+            line, split = line[split_interval], split[split_interval]
+            keep[line, split] = True
+
+            line, start, stop = np.tile(line,2), np.concatenate((start[split_interval],split)), np.concatenate((split,stop[split_interval]))
+
+        return keep
+
+
+class RasterMeshPlotter(MeshPlotter):
+    def __init__(self,*,
+        extent : float = 2,
+        resolution : Union[int,tuple[int,int]] = None,
+        chunk_size : int = 2**20,
+        **kwargs
+    ):
+        # Points and grid-lines are accumulated into a pixel buffer covering [-extent,extent]^2 and shown as one image
+        MeshPlotter.__init__(self,**kwargs)
+
+        self.extent = extent
+        self.resolution = resolution
+        self.chunk_size = chunk_size
+
+    def plot_grid_lines(self, alpha_lines : np.ndarray, beta_lines : np.ndarray, points : np.ndarray, ax : Axes = None, masks : tuple[MeshMask,MeshMask,MeshMask] = None):
+
+        if ax is None: ax = plt.gca()
+        alpha_mask, beta_mask, points_mask = masks or (None,None,None)
+
+        width, height = self._get_raster_shape(ax)
+        pixels_per_point = ax.figure.dpi/72 * width/max(ax.get_window_extent().width,1)
+
+        # Lines, painted with the value of the parameter at the segment midpoints
+        line_layer = self._new_layer(width, height)
+        for axis, lines, mask in ((0, alpha_lines, alpha_mask), (1, beta_lines, beta_mask)):
+            p0, p1 = (lines[:-1,:], lines[1:,:]) if axis == 0 else (lines[:,:-1], lines[:,1:])
+            p0, p1, values = p0.reshape((-1,2)), p1.reshape((-1,2)), self._get_midpoint_values(self._get_paint_values(lines),axis)
+            if mask is not None: p0, p1, values = p0[mask.segments(axis).ravel()], p1[mask.segments(axis).ravel()], values[mask.segments(axis).ravel()]
+
+            self._rasterize_lines(line_layer, p0, p1, values, self.grid_color, self.linewidth*pixels_per_point, width, height)
+
+        # Points, stamped as discs of the marker size
+        point_layer = self._new_layer(width, height)
+        if self.markersize > 0:
+            marker_radius = np.sqrt(self.markersize)*pixels_per_point/2
+            visible = slice(None) if points_mask is None else points_mask.points.ravel()
+            self._rasterize_points(point_layer, points.reshape((-1,2))[visible], self._get_paint_values(points).ravel()[visible], self.points_color, marker_radius, width, height)
+
+        image = self._composite(point_layer, self._composite_layer(line_layer, width, height), width, height)
+        ax.imshow(image, extent=(-self.extent,self.extent,-self.extent,self.extent), origin="lower", interpolation="nearest", aspect="auto", zorder=2)
+
+    def _get_raster_shape(self, ax : Axes) -> tuple[int,int]:
+        if self.resolution is not None:
+            return (self.resolution, self.resolution) if np.isscalar(self.resolution) else tuple(self.resolution)
+
+        bbox = ax.get_window_extent()
+        return max(int(np.ceil(bbox.width)),1), max(int(np.ceil(bbox.height)),1)
+
+    def _get_colors(self, color : Union[str,Colormap], values : np.ndarray) -> np.ndarray:
         if isinstance(color, Colormap):
-            color_dim = int(self.paint_parameter == "beta")
+            return color(values)[:,0:3]
+        return np.broadcast_to(np.array([*hex2color(color)]), (values.size,3))
 
-            color = color(np.linspace(0,1,mesh.shape[color_dim]))[None,:,0:3]
-            color = np.repeat(color,mesh.shape[1-color_dim],axis=0)
+    def _new_layer(self, width : int, height : int) -> tuple[np.ndarray,np.ndarray,np.ndarray]:
+        # Coverage weighted color sums, total coverage and accumulated opacity (-log of the transparency) per pixel
+        return np.zeros((3,width*height)), np.zeros(width*height), np.zeros(width*height)
 
-            if self.paint_parameter == "alpha": color = color.transpose((1,0,2))
-            
-        else:
-            color = np.array([*hex2color(color)])[None,None,:]
-        
-        return color
+    def _to_pixels(self, points : np.ndarray, width : int, height : int) -> np.ndarray:
+        return (points + self.extent)/(2*self.extent) * np.array([width,height])
+
+    def _accumulate(self, layer, pixels : np.ndarray, coverage : np.ndarray, colors : np.ndarray, width : int, height : int):
+        color_sum, coverage_sum, opacity = layer
+        index = np.clip(pixels[:,1].astype(np.intp),0,height-1)*width + np.clip(pixels[:,0].astype(np.intp),0,width-1)
+
+        # Compositing partially covering fragments over each other, independently of their order
+        coverage = np.minimum(coverage,1)
+        opacity += np.bincount(index, weights=-np.log1p(-np.minimum(coverage,1-1e-6)), minlength=opacity.size)
+
+        coverage_sum += np.bincount(index, weights=coverage, minlength=coverage_sum.size)
+        for channel in range(3):
+            color_sum[channel] += np.bincount(index, weights=coverage*colors[:,channel], minlength=coverage_sum.size)
+
+    def _rasterize_points(self, layer, points : np.ndarray, values : np.ndarray, color : Union[str,Colormap], radius : float, width : int, height : int):
+        # Pixel offsets covered by a marker, at least the pixel containing its center
+        reach = int(np.ceil(radius))
+        dx, dy = np.meshgrid(np.arange(-reach,reach+1),np.arange(-reach,reach+1))
+        inside = dx**2 + dy**2 <= max(radius**2,0)
+        stamp = np.stack((dx[inside],dy[inside]),axis=1)
+        stamp_coverage = min(np.pi*radius**2/stamp.shape[0],1) # Small markers partially cover their pixel
+
+        chunk_size = max(self.chunk_size//stamp.shape[0],1)
+        for start in range(0,points.shape[0],chunk_size):
+            pixels = self._to_pixels(points[start:start+chunk_size], width, height)
+            visible = np.all(np.isfinite(pixels),axis=1) & np.all(pixels > -reach,axis=1) & (pixels[:,0] < width+reach) & (pixels[:,1] < height+reach)
+
+            pixels = (np.floor(pixels[visible])[:,None,:] + stamp[None,:,:]).reshape((-1,2))
+            on_raster = np.all(pixels >= 0,axis=1) & (pixels[:,0] < width) & (pixels[:,1] < height)
+
+            colors = np.repeat(self._get_colors(color,values[start:start+chunk_size][visible]),stamp.shape[0],axis=0)
+            self._accumulate(layer, pixels[on_raster], np.full(np.count_nonzero(on_raster),stamp_coverage), colors[on_raster], width, height)
+
+    def _rasterize_lines(self, layer, p0 : np.ndarray, p1 : np.ndarray, values : np.ndarray, color : Union[str,Colormap], line_width : float, width : int, height : int):
+        for start in range(0,p0.shape[0],self.chunk_size):
+            chunk = slice(start,start+self.chunk_size)
+            a, b = self._to_pixels(p0[chunk], width, height), self._to_pixels(p1[chunk], width, height)
+            a, b, keep = self._clip_segments(a, b, width, height)
+            if not np.any(keep): continue
+
+            a, b, chunk_values = a[keep], b[keep], values[chunk][keep]
+
+            # Sample every segment about once per pixel of length, clipped segments are at most a raster diagonal long
+            length = np.hypot(*(b-a).T)
+            samples = np.ceil(length).astype(np.intp) + 1
+
+            # Runs of segments with about chunk_size samples in total, so that long segments do not inflate the buffers
+            ends = np.cumsum(samples)
+            bounds = np.unique(np.concatenate(([0], np.searchsorted(ends, np.arange(self.chunk_size,ends[-1],self.chunk_size), side="right"), [samples.size])))
+            for run in map(slice, bounds[:-1], bounds[1:]):
+                self._rasterize_segments(layer, a[run], b[run], length[run], samples[run], chunk_values[run], color, line_width, width, height)
+
+    def _rasterize_segments(self, layer, a : np.ndarray, b : np.ndarray, length : np.ndarray, samples : np.ndarray, values : np.ndarray, color : Union[str,Colormap], line_width : float, width : int, height : int):
+        segment = np.repeat(np.arange(samples.size), samples)
+        offset = np.arange(segment.size) - np.repeat(np.cumsum(samples)-samples, samples)
+        t = (offset/np.maximum(samples-1,1)[segment])[:,None]
+
+        pixels = a[segment]*(1-t) + b[segment]*t
+        weights = (line_width*length/samples)[segment]
+
+        self._accumulate(layer, pixels, weights, self._get_colors(color,values)[segment], width, height)
+
+    def _clip_segments(self, a : np.ndarray, b : np.ndarray, width : int, height : int) -> tuple[np.ndarray,np.ndarray,np.ndarray]:
+        # Liang-Barsky clipping against the raster, segments fully outside (or not finite) are dropped
+        d = b - a
+        t0, t1 = np.zeros(a.shape[0]), np.ones(a.shape[0])
+        keep = np.all(np.isfinite(a),axis=1) & np.all(np.isfinite(b),axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for p, q in ((-d[:,0], a[:,0]), (d[:,0], width-a[:,0]), (-d[:,1], a[:,1]), (d[:,1], height-a[:,1])):
+                r = q/p
+                t0 = np.where(p < 0, np.maximum(t0,r), t0)
+                t1 = np.where(p > 0, np.minimum(t1,r), t1)
+                keep &= ~((p == 0) & (q < 0))
+
+        keep &= t0 <= t1
+        return a + t0[:,None]*d, a + t1[:,None]*d, keep
+
+    def _composite_layer(self, layer, width : int, height : int) -> np.ndarray:
+        color_sum, coverage, opacity = layer
+        rgba = np.zeros((height*width,4))
+
+        covered = coverage > 0
+        rgba[covered,0:3] = (color_sum[:,covered]/coverage[covered]).T
+        rgba[:,3] = -np.expm1(-opacity)
+
+        return rgba
+
+    def _composite(self, top_layer, bottom : np.ndarray, width : int, height : int) -> np.ndarray:
+        top = self._composite_layer(top_layer, width, height)
+
+        alpha = top[:,3:] + bottom[:,3:]*(1-top[:,3:])
+        rgb = np.divide(top[:,0:3]*top[:,3:] + bottom[:,0:3]*bottom[:,3:]*(1-top[:,3:]), alpha, out=np.zeros_like(top[:,0:3]), where=alpha > 0)
+
+        return np.concatenate((rgb,alpha),axis=1).reshape((height,width,4))
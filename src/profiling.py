@@ -0,0 +1,97 @@
+import numpy as np
+
+import contextlib
+import json
+import time
+import tracemalloc
+
+from typing import Callable, Iterator, List
+
+class StageRecord:
+    def __init__(self, name : str, path : str):
+        self.name = name
+        self.path = path
+
+        self.wall_time = 0.0
+        self.peak_bytes : int = None
+        self.points : int = None
+        self.non_finite : int = None
+
+    def record_points(self, points : np.ndarray):
+        points = np.asarray(points)
+        self.points = (self.points or 0) + points.size
+        self.non_finite = (self.non_finite or 0) + int(points.size - np.count_nonzero(np.isfinite(points)))
+
+    def to_dict(self) -> dict:
+        return dict(name=self.name, path=self.path, wall_time=self.wall_time, peak_bytes=self.peak_bytes, points=self.points, non_finite=self.non_finite)
+
+class _NullRecord:
+    def record_points(self, points : np.ndarray): pass
+
+class Profiler:
+    def __init__(self, *, trace_memory : bool = False, on_record : Callable[[StageRecord],None] = None):
+        # Tracing memory slows down allocation heavy stages, their wall times are then only comparable with each other
+        self.trace_memory = trace_memory
+        self.on_record = on_record
+
+        self.records : List[StageRecord] = []
+        self._stack : List[tuple[StageRecord,int]] = [] # Open stages and their traced memory at entry
+
+    @contextlib.contextmanager
+    def stage(self, name : str) -> Iterator[StageRecord]:
+        record = StageRecord(name, "/".join([r.path for r, _ in self._stack[-1:]] + [name]))
+        self.records.append(record)
+
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing: tracemalloc.start()
+        if self.trace_memory:
+            # The peak of the enclosing stage is kept in its own record before the peak is reset
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack: self._stack[-1][0].peak_bytes = max(self._stack[-1][0].peak_bytes or 0, peak - self._stack[-1][1])
+            tracemalloc.reset_peak()
+
+        self._stack.append((record, current if self.trace_memory else 0))
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall_time = time.perf_counter() - start
+            _, entry_bytes = self._stack.pop()
+
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                record.peak_bytes = max(record.peak_bytes or 0, peak - entry_bytes)
+                if self._stack: self._stack[-1][0].peak_bytes = max(self._stack[-1][0].peak_bytes or 0, peak - self._stack[-1][1])
+                if started_tracing: tracemalloc.stop()
+
+            if self.on_record is not None: self.on_record(record)
+
+    def report(self) -> dict:
+        totals = dict()
+        for record in self.records:
+            totals[record.name] = totals.get(record.name, 0.0) + record.wall_time
+
+        return dict(stages=[r.to_dict() for r in self.records], wall_time_by_stage=totals)
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.report(), **kwargs)
+
+
+# Stages are recorded by the innermost active profiler, without one they cost a single check
+_profilers : List[Profiler] = []
+
+@contextlib.contextmanager
+def profiling(profiler : Profiler = None) -> Iterator[Profiler]:
+    profiler = Profiler() if profiler is None else profiler
+    _profilers.append(profiler)
+    try:
+        yield profiler
+    finally:
+        _profilers.remove(profiler)
+
+_null_stage = contextlib.nullcontext(_NullRecord())
+
+def profile_stage(name : str) -> contextlib.AbstractContextManager:
+    if not _profilers:
+        return _null_stage
+    return _profilers[-1].stage(name)
@@ -0,0 +1,98 @@
+import numpy as np
+
+import os
+import pytest
+
+from src.domain import RadialComplexDomain
+from src.mesh import build_domain_mesh, CachedMesh, MeshStore, DiskMeshStore, hash_key
+
+def array(value : float, size : int = 16) -> np.ndarray:
+    return np.full(size, value) # 8 bytes per point
+
+
+def test_store_evicts_least_recently_used():
+    store = MeshStore(max_bytes=3*128)
+    for key in "abc": store.put(key, array(1))
+
+    store.get("a") # b is now the least recently used
+    store.put("d", array(2))
+
+    assert "b" not in store and all(key in store for key in "acd")
+    assert store.stats()["evictions"] == 1 and store.nbytes == 3*128
+
+def test_store_counts_hits_and_misses():
+    store = MeshStore()
+    calls = []
+    compute = lambda: calls.append(1) or array(3)
+
+    first, second = store.get_or_compute("k", compute), store.get_or_compute("k", compute)
+    assert second is first and len(calls) == 1
+    assert (store.hits, store.misses) == (1, 1)
+
+def test_stored_arrays_are_read_only_views():
+    store = MeshStore()
+    points = array(1)
+    stored = store.put("k", points)
+
+    assert not stored.flags.writeable and np.shares_memory(stored, points)
+    with pytest.raises(ValueError):
+        stored[0] = 2
+
+def test_cached_mesh_returns_the_same_read_only_array():
+    store = MeshStore()
+    mesh = CachedMesh(build_domain_mesh(RadialComplexDomain(), 8, 8), store=store, key=hash_key("mesh"))
+
+    points = mesh.get_mesh_points()
+    assert mesh.get_mesh_points() is points and not points.flags.writeable
+    assert store.stats()["entries"] == 1
+
+def test_put_over_budget_discards_the_previous_value():
+    store = MeshStore(max_bytes=256)
+    store.put("k", array(1))
+    store.put("k", array(2, size=64))
+
+    assert "k" not in store and store.nbytes == 0
+
+
+def test_hash_key_distinguishes_arrays_with_the_same_repr():
+    a, b = np.zeros(10000), np.zeros(10000)
+    b[5000] = 1
+
+    assert repr(a) == repr(b)
+    assert hash_key("mesh", a) != hash_key("mesh", b)
+    assert hash_key("mesh", a) == hash_key("mesh", a.copy())
+    assert hash_key(np.zeros(4)) != hash_key(np.zeros((2,2))) != hash_key(np.zeros(4, dtype=np.float32))
+
+def test_disk_store_reloads_read_only_memory_map(tmp_path):
+    points = np.arange(12, dtype=complex).reshape(3,4)
+    DiskMeshStore(str(tmp_path)).put("k", points)
+
+    store = DiskMeshStore(str(tmp_path))
+    loaded = store.get("k")
+    assert isinstance(loaded, np.memmap) and not loaded.flags.writeable
+    np.testing.assert_array_equal(loaded, points)
+    assert (store.hits, store.misses) == (1, 0)
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    store = DiskMeshStore(str(tmp_path), max_bytes=2*256) # Two files, each 128 bytes of points and a 128 byte header
+    store.put("a", array(1)); store.put("b", array(2))
+    os.utime(store._path("a"), (0,0))
+
+    store.put("c", array(3))
+    assert "a" not in store and "b" in store and "c" in store
+
+def test_disk_store_treats_concurrent_eviction_as_miss(tmp_path, monkeypatch):
+    store = DiskMeshStore(str(tmp_path))
+    store.put("k", array(1))
+
+    def evicted(path): raise FileNotFoundError(path)
+    monkeypatch.setattr(os, "utime", evicted)
+
+    assert store.get("k") is None and store.misses == 1
+
+def test_disk_store_put_over_budget_discards_the_previous_value(tmp_path):
+    store = DiskMeshStore(str(tmp_path), max_bytes=512)
+    store.put("k", array(1))
+    store.put("k", array(2, size=256))
+
+    assert "k" not in store
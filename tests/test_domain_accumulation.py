@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import scipy.stats
+
+from src.mesh.domain_accumulation_mesh import DomainBetaAccumulationMesh
+
+MixtureOfBetas = DomainBetaAccumulationMesh.MixtureOfBetas
+
+@pytest.mark.parametrize("a", [1.2, 2, 4, 30, 300])
+@pytest.mark.parametrize("b", [1.5, 4, 50])
+def test_single_beta_ppf_matches_scipy(a, b):
+    # Without the uniform component the mixture is a single beta distribution
+    mixture = MixtureOfBetas([(a,b)], uniform_weight=0)
+    q = np.linspace(0,1,513)
+
+    np.testing.assert_allclose(mixture.ppf(q), scipy.stats.beta.ppf(q,a,b), rtol=0, atol=1e-12)
+
+@pytest.mark.parametrize("values", [(0.5,), (0.3,0.7), (0.05,0.5,0.95)])
+@pytest.mark.parametrize("concentration", [1, 4, 16, 300])
+def test_mixture_ppf_inverts_cdf(values, concentration):
+    mixture = DomainBetaAccumulationMesh._build_cached_rv(values, float(concentration))
+    q = np.linspace(0,1,1001)
+
+    x = mixture.ppf(q)
+    assert np.all(np.diff(x) >= 0)
+    np.testing.assert_allclose(mixture.cdf(x), q, rtol=0, atol=1e-12)
+
+def test_mixture_ppf_matches_generic_root_finder():
+    mixture = DomainBetaAccumulationMesh._build_cached_rv((0.3,0.7), 4.0)
+    q = np.linspace(0,1,101)
+
+    np.testing.assert_allclose(mixture.ppf(q), scipy.stats.rv_continuous._ppf(mixture,q), rtol=0, atol=1e-12)
+
+def test_mixture_without_components_is_identity():
+    q = np.linspace(0,1,11)
+    np.testing.assert_array_equal(MixtureOfBetas([]).ppf(q), q)
@@ -0,0 +1,108 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pytest
+
+from holomap import HoloMapConfig, HoloMapFacade
+from src.mesh import MeshStore
+
+def make_facade(*args : str) -> HoloMapFacade:
+    return HoloMapFacade(HoloMapConfig.parse_args(list(args)))
+
+
+def test_parse_mapping_cache_hits_and_misses():
+    HoloMapFacade.clear_mapping_cache()
+    facade, other = make_facade("z"), make_facade("z")
+
+    first = facade.parse_mapping("z^2 + 1")
+    info = HoloMapFacade.mapping_cache_info()
+    assert (info.hits, info.misses) == (0, 1)
+
+    # Whitespace is normalized and the cache is shared between facades
+    assert other.parse_mapping("z^2  +   1") is first
+    info = HoloMapFacade.mapping_cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+    facade.parse_mapping("z^3")
+    assert HoloMapFacade.mapping_cache_info().misses == 2
+
+def test_parse_mapping_rejects_invalid_expressions():
+    with pytest.raises(ValueError):
+        make_facade("z").parse_mapping("z^")
+
+
+def test_unchanged_stages_are_reused():
+    facade = HoloMapFacade(HoloMapConfig.parse_args(["z^2","--primitive_domain_mappings","z+1"]), mesh_store=MeshStore())
+    facade.plot_mesh()
+    assert not any(facade.stage_report[stage] for stage in ("domain","primitive_mappings","mappings"))
+
+    facade.plot_mesh()
+    assert all(facade.stage_report[stage] for stage in ("domain","primitive_mappings","mappings"))
+
+    # Only the stages downstream of a change are rebuilt
+    facade.config.domain_config.mappings = ("exp(z)",)
+    facade.plot_mesh()
+    assert facade.stage_report["domain"] and facade.stage_report["primitive_mappings"] and not facade.stage_report["mappings"]
+
+    facade.config.mesh_config.alpha_resolution = 8
+    facade.plot_mesh()
+    assert not any(facade.stage_report[stage] for stage in ("domain","primitive_mappings","mappings"))
+
+
+def test_seeded_facades_sample_the_same_mesh():
+    def points(*args):
+        init_mesh, _ = HoloMapFacade(HoloMapConfig.parse_args(["z^2","--sampling_method","sobol",*args]), mesh_store=MeshStore())._get_meshes()
+        return init_mesh.get_mesh_points()
+
+    np.testing.assert_array_equal(points("--seed","3"), points("--seed","3"))
+    assert not np.array_equal(points("--seed","3"), points("--seed","4"))
+    assert not np.array_equal(points(), points())
+
+
+def test_compiled_backends_render_poles():
+    facade = HoloMapFacade(HoloMapConfig.parse_args(["1/(z-1)","--primitive_domain_mappings","z+1","--backend","numba"]), mesh_store=MeshStore())
+    with np.errstate(all="ignore"):
+        facade.plot_mesh()
+
+
+@pytest.mark.parametrize("cull, backend, extents", [
+    ("auto", "agg", [2.0, 2.0]),
+    ("auto", "tkagg", [None, None]), # Shown in a window, which can be panned
+    ("always", "tkagg", [2.0, 2.0]),
+    ("never", "agg", []),
+])
+def test_culling_keeps_the_geometry_of_interactive_figures(monkeypatch, cull, backend, extents):
+    import holomap
+    import matplotlib.pyplot as plt
+
+    culler_extents = []
+    class RecordingCuller(holomap.ViewportCuller):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            culler_extents.append(self.extent)
+    monkeypatch.setattr(holomap, "ViewportCuller", RecordingCuller)
+    monkeypatch.setattr(matplotlib, "get_backend", lambda: backend)
+
+    make_facade("z^2","--cull",cull,"--axis_scale","2").make_figure()
+    plt.close("all")
+    assert culler_extents == extents
+
+
+def test_reused_stages_follow_the_parallel_config():
+    store = MeshStore()
+    facade = HoloMapFacade(HoloMapConfig.parse_args(["exp(z)","--primitive_domain_mappings","z^2","--alpha_resolution","256","--beta_resolution","256","--workers","2"]), mesh_store=store)
+    evaluator = facade._evaluator
+    facade.plot_mesh()
+    pool = evaluator._executor
+    assert pool is not None and pool._max_workers == 2
+
+    # Reused stages are evaluated again with the new pool, the old one is shut down
+    facade.config.mesh_config.workers = 3
+    store.clear()
+    facade.plot_mesh()
+    assert facade.stage_report["primitive_mappings"] and facade.stage_report["mappings"]
+    assert pool._shutdown and evaluator._executor._max_workers == 3
+    assert all(facade._stages[stage][1].base_mesh.evaluator is evaluator for stage in ("primitive_mappings","mappings"))
+
+    evaluator.shutdown()
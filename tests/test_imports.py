@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only the render stages need
+DEFERRED_MODULES = {"matplotlib","scipy","sympy","numexpr","numba"}
+
+def imported_modules(code : str) -> set[str]:
+    code = "import sys\n{}\nprint(*sys.modules)".format(code)
+    return set(subprocess.run([sys.executable,"-c",code],cwd=ROOT,capture_output=True,text=True,check=True).stdout.split())
+
+
+@pytest.mark.parametrize("code", [
+    "import holomap",
+    "import holomap; holomap.HoloMapConfig.parse_args(['z^2','--alpha_resolution','64','--sampling_method','sobol'])",
+    "import holomap; holomap.HoloMapFacade(holomap.HoloMapConfig.parse_args(['z^2'])).parse_mapping('exp(z)')",
+])
+def test_config_parsing_defers_heavy_imports(code):
+    assert not {m.split(".")[0] for m in imported_modules(code)} & DEFERRED_MODULES
+
+def test_serial_renders_do_not_load_shared_memory():
+    # Process pools need shared memory, which pyodide does not provide
+    code = "import matplotlib; matplotlib.use('Agg')\nimport holomap; holomap.HoloMapFacade(holomap.HoloMapConfig.parse_args(['z^2'])).make_figure()"
+    assert not imported_modules(code) & {"multiprocessing.shared_memory", "_posixshmem"}
+
+def test_help_runs():
+    result = subprocess.run([sys.executable,os.path.join(ROOT,"holomap.py"),"--help"],cwd=ROOT,capture_output=True,text=True)
+    assert result.returncode == 0 and "--sampling_method" in result.stdout
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from src.mapping import ExpressionMapping, fuse_mappings
+
+POINTS = np.exp(2j*np.pi*np.linspace(0,1,64,endpoint=False)) * np.linspace(0.1,3,64)
+
+def apply(transformations, points):
+    for t in transformations:
+        points = t(points)
+    return points
+
+
+def test_fused_mappings_match_sequential_application():
+    mappings = [ExpressionMapping("z^2"), ExpressionMapping("exp(z)"), ExpressionMapping("(z-1)/(z+1)")]
+    fused = fuse_mappings(mappings)
+
+    assert len(fused) == 1
+    np.testing.assert_allclose(fused[0](POINTS), apply(mappings, POINTS), rtol=1e-12)
+
+def test_fusion_keeps_other_callables_in_place():
+    double = lambda z: 2*z
+    mappings = [ExpressionMapping("z+1"), ExpressionMapping("z^2"), double, ExpressionMapping("1/z")]
+    fused = fuse_mappings(mappings)
+
+    assert len(fused) == 3 and fused[1] is double and fused[2] is mappings[3]
+    np.testing.assert_allclose(apply(fused, POINTS), apply(mappings, POINTS), rtol=1e-12)
+
+
+@pytest.mark.parametrize("expression", ["exp(z, z)", "power(z)", "sin()", "arg(z, 1)", "exp(z, out=z)", "exp(*z)", "os.system(z)", "__import__(z)", "z.real", "[z][0]", "'z'", "y"])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        ExpressionMapping(expression)
+
+@pytest.mark.parametrize("expression", ["z^2+1", "exp(z)", "E^z", "sin(z)/z", "(z-1)/(z+1)", "sqrt(z)", "log(z)", "2*I*z - z^3", "cosh(z)*pi", "1/(z^2+1)", "asin(z)", "power(z, 2.5)", "conjugate(z)*z"])
+def test_compiled_mappings_match_sympy_lambdify(expression):
+    # The expressions as the sympy facade evaluated them
+    sympy = pytest.importorskip("sympy")
+    reference = sympy.lambdify(sympy.Symbol("z"), sympy.sympify(expression.replace("^","**")), "numpy")
+
+    np.testing.assert_allclose(ExpressionMapping(expression)(POINTS), reference(POINTS), rtol=1e-12)
+
+
+@pytest.mark.parametrize("backend", ["numexpr", "numba"])
+@pytest.mark.parametrize("expression", ["exp(z)*z^2 - 1/z", "sin(z)/(z+2)", "abs(z)", "re(z)", "im(z)"])
+@pytest.mark.parametrize("dtype", [np.complex128, np.complex64])
+def test_backends_match_numpy(backend, expression, dtype):
+    pytest.importorskip(backend)
+    mapping, reference = ExpressionMapping(expression, backend=backend), ExpressionMapping(expression)
+    points = POINTS.astype(dtype)
+
+    assert mapping.backend == backend
+    result, expected = mapping(points), reference(points)
+    assert result.dtype == expected.dtype
+    np.testing.assert_allclose(result, expected, rtol=1e-5 if dtype == np.complex64 else 1e-12)
+
+@pytest.mark.parametrize("backend", ["numexpr", "numba"])
+def test_backends_evaluate_poles_as_numpy(backend):
+    pytest.importorskip(backend)
+    points = np.array([0, 1, 2, 1j])
+    with np.errstate(all="ignore"):
+        result, expected = ExpressionMapping("1/(z-1)", backend=backend)(points), ExpressionMapping("1/(z-1)")(points)
+
+    assert not np.isfinite(result[1])
+    np.testing.assert_allclose(result[np.isfinite(expected)], expected[np.isfinite(expected)], rtol=1e-12)
+
+def test_unsupported_functions_fall_back_to_numpy():
+    pytest.importorskip("numexpr")
+    with pytest.warns(RuntimeWarning, match="numexpr"):
+        mapping = ExpressionMapping("arg(z)", backend="numexpr")
+
+    assert mapping.backend == "numpy"
+    np.testing.assert_array_equal(mapping(POINTS), np.angle(POINTS))
@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+
+from src.domain import RadialComplexDomain, QuadrantsComplexDomain
+from src.mapping import ExpressionMapping
+from src.mesh import build_domain_mesh, TransformedMesh, ComplexToMesh2D, PrecisionWarning, shared_evaluation
+from src.mesh.domain_mesh import AdaptiveSamplingDomainMesh, QuasiRandomSamplingDomainMesh
+
+def reassemble(mesh, tile_shape) -> np.ndarray:
+    tiles = list(mesh.iter_mesh_tiles(tile_shape))
+    shape = (max(index[0].stop for index, _ in tiles), max(index[1].stop for index, _ in tiles))
+    points = np.full(shape, np.nan, dtype=tiles[0][1].dtype)
+    for index, tile in tiles:
+        points[index] = tile
+
+    return points
+
+
+@pytest.mark.parametrize("tile_shape", [(4,7), (1,None), (None,None), (50,50)])
+def test_tiles_reassemble_to_full_mesh(tile_shape):
+    mesh = build_domain_mesh(RadialComplexDomain(), 20, 30, transformations=[ExpressionMapping("z^2"), ExpressionMapping("exp(z)")])
+    np.testing.assert_array_equal(reassemble(mesh, tile_shape), mesh.get_mesh_points())
+
+def test_tiles_share_boundary_rows():
+    mesh = build_domain_mesh(QuadrantsComplexDomain(), 9, 9)
+    indices = [index for index, _ in mesh.iter_mesh_tiles((4,4))]
+
+    assert [index[0] for index in indices[::2]] == [slice(0,5), slice(4,9)]
+
+
+def dense_gaussian_accumulation(points : np.ndarray, attractors : np.ndarray, sharpness : float) -> np.ndarray:
+    # Reference: every attractor at once, as a (K, A, B) tensor
+    diff = attractors[:,None,None] - points[None]
+    return points + np.mean(diff*np.exp(-(np.abs(diff)*sharpness)**2), axis=0)
+
+def test_gaussian_accumulation_matches_dense_reference():
+    attractors = np.array([0.5+0.5j, -0.3j, 0.8, -0.6+0.1j])
+    base = build_domain_mesh(RadialComplexDomain(), 40, 30).get_mesh_points()
+    mesh = build_domain_mesh(RadialComplexDomain(), 40, 30, mesh_accumulate_points=attractors, mesh_accumulate_args=dict(sharpness=3))
+
+    np.testing.assert_allclose(mesh.get_mesh_points(), dense_gaussian_accumulation(base, attractors, 3), rtol=1e-14, atol=1e-15)
+
+def test_gaussian_accumulation_cutoff_drops_negligible_contributions():
+    attractors = np.random.default_rng(0).uniform(-1,1,(30,2)) @ np.array([1,1j])
+    args = dict(mesh_accumulate_points=attractors, mesh_accumulate_args=dict(sharpness=4))
+    full = build_domain_mesh(RadialComplexDomain(), 60, 60, **args).get_mesh_points()
+
+    args["mesh_accumulate_args"]["cutoff"] = 6
+    cut = build_domain_mesh(RadialComplexDomain(), 60, 60, **args).get_mesh_points()
+
+    np.testing.assert_allclose(cut, full, rtol=0, atol=1e-14)
+
+
+def test_shared_evaluation_materializes_each_mesh_once():
+    calls = []
+    def mapping(points):
+        calls.append(points.shape)
+        return points**2
+
+    mesh = TransformedMesh(build_domain_mesh(RadialComplexDomain(), 10, 12), [mapping])
+    with shared_evaluation():
+        ComplexToMesh2D(mesh).get_mesh_points()
+        second = mesh.get_mesh_points()
+        assert mesh.get_mesh_points() is second and not second.flags.writeable
+    assert len(calls) == 1
+
+    mesh.get_mesh_points()
+    assert len(calls) == 2
+
+
+def test_single_precision_mesh_stays_single_precision():
+    mesh = build_domain_mesh(RadialComplexDomain(), 16, 16, dtype=np.complex64, transformations=[ExpressionMapping("exp(z)*pi")])
+    points = mesh.get_mesh_points()
+
+    assert points.dtype == np.complex64
+    np.testing.assert_allclose(points, np.exp(mesh.base_mesh.get_mesh_points().astype(complex))*np.pi, rtol=1e-5)
+
+def test_single_precision_overflow_is_reported():
+    mesh = build_domain_mesh(RadialComplexDomain(), 16, 16, dtype=np.complex64, transformations=[ExpressionMapping("exp(100*z)")])
+    with np.errstate(all="ignore"), pytest.warns(PrecisionWarning, match="overflowed in single precision"):
+        mesh.get_mesh_points()
+
+def test_poles_are_not_reported_as_overflow(recwarn):
+    mesh = build_domain_mesh(QuadrantsComplexDomain(), 9, 9, dtype=np.complex64, transformations=[ExpressionMapping("1/z")])
+    with np.errstate(all="ignore"):
+        mesh.get_mesh_points()
+
+    assert not [w for w in recwarn if issubclass(w.category, PrecisionWarning)]
+
+
+@pytest.mark.parametrize("dtype", [np.complex128, np.complex64])
+def test_complex_to_2D_is_a_view(dtype):
+    mesh = build_domain_mesh(RadialComplexDomain(), 6, 7, dtype=dtype, use_cache=True)
+    points, points_2D = mesh.get_mesh_points(), ComplexToMesh2D(mesh).get_mesh_points()
+
+    assert points_2D.shape == (*points.shape, 2) and np.shares_memory(points, points_2D)
+    np.testing.assert_array_equal(points_2D[...,0], points.real)
+    np.testing.assert_array_equal(points_2D[...,1], points.imag)
+
+
+def adaptive_mesh(mesh):
+    while not isinstance(mesh, AdaptiveSamplingDomainMesh):
+        mesh = getattr(mesh, "base_domain_mesh", None) or mesh.base_mesh
+    return mesh
+
+def test_adaptive_refinement_fits_point_budget():
+    mapping = ExpressionMapping("exp(3*z)")
+    mesh = build_domain_mesh(RadialComplexDomain(), 8, 8, sampling_method="adaptive", sampling_args=dict(transformations=[mapping], max_points=400))
+    alpha, beta = adaptive_mesh(mesh)._sample_alpha_beta()
+
+    assert 8*8 < alpha.size*beta.size <= 400
+    assert np.all(np.diff(alpha) > 0) and np.all(np.diff(beta) > 0)
+
+def test_adaptive_refinement_scores_accumulated_points():
+    mapping = ExpressionMapping("z^2")
+    mesh = build_domain_mesh(RadialComplexDomain(), 8, 8, sampling_method="adaptive", sampling_args=dict(transformations=[mapping], max_points=400),
+                             alpha_accumulate_values=(0.3,), beta_accumulate_values=(0.5,), mesh_accumulate_points=[0.5+0.5j])
+    base_mesh = adaptive_mesh(mesh)
+    assert base_mesh.points_mesh is mesh
+
+    # The refined points are those of the accumulated mesh, not of the domain it samples
+    alpha, beta = np.linspace(0,1,5), np.linspace(0,1,6)
+    np.testing.assert_array_equal(base_mesh._evaluate(alpha, beta), mapping(mesh._points_at(alpha, beta)))
+    assert not np.allclose(base_mesh._evaluate(alpha, beta), mapping(base_mesh.domain.get_points(alpha[:,None], beta[None,:])))
+
+
+@pytest.mark.parametrize("sampling_method", ["uniform", "adaptive"])
+@pytest.mark.parametrize("axis", [0, 1])
+def test_grid_lines_pass_through_mesh_points(sampling_method, axis):
+    args = dict(sampling_method=sampling_method, alpha_accumulate_values=(0.3,), beta_accumulate_values=(0.6,),
+                sampling_args=dict(transformations=[ExpressionMapping("exp(2*z)")], max_points=200) if sampling_method == "adaptive" else None)
+    points = build_domain_mesh(RadialComplexDomain(), 6, 9, **args).get_mesh_points()
+    lines = build_domain_mesh(RadialComplexDomain(), 6, 9, line_samples=41, line_axis=axis, **args)
+    line_points = lines.get_mesh_points()
+
+    # Every step-th sample along the dense parameter is a mesh-point
+    dense = [slice(None), slice(None)]
+    dense[axis] = slice(None, None, lines.step)
+    np.testing.assert_array_equal(line_points[tuple(dense)], points)
+    assert line_points.shape[axis] >= 41 and line_points.shape[1-axis] == points.shape[1-axis]
+
+
+@pytest.mark.parametrize("sampling_method", ["random", "sobol", "halton"])
+def test_seeded_sampling_is_deterministic(sampling_method):
+    def points(seed):
+        return build_domain_mesh(RadialComplexDomain(), 16, 12, sampling_method=sampling_method, sampling_args=dict(seed=seed)).get_mesh_points()
+
+    np.testing.assert_array_equal(points(7), points(7))
+    assert not np.array_equal(points(7), points(8))
+
+    # Unseeded meshes draw a seed once, every use shares the same samples
+    mesh = build_domain_mesh(RadialComplexDomain(), 16, 12, sampling_method=sampling_method)
+    np.testing.assert_array_equal(mesh.get_mesh_points(), mesh.get_mesh_points())
+
+@pytest.mark.parametrize("sampling_method", ["sobol", "halton"])
+def test_low_discrepancy_sampling_covers_evenly(sampling_method):
+    def max_gap(sampling_method, seed):
+        alpha, _ = build_domain_mesh(RadialComplexDomain(), 64, 2, sampling_method=sampling_method, sampling_args=dict(seed=seed))._sample_alpha_beta()
+        return np.max(np.diff(np.concatenate(([0], alpha, [1]))))
+
+    assert all(0 <= max_gap(sampling_method, seed) < 3/64 for seed in range(10))
+    assert np.mean([max_gap(sampling_method, seed) for seed in range(10)]) < np.mean([max_gap("random", seed) for seed in range(10)])
+
+def test_invalid_sequence_is_rejected():
+    with pytest.raises(ValueError):
+        QuasiRandomSamplingDomainMesh(RadialComplexDomain(), 4, 4, sequence="lattice")
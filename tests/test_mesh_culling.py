@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.mesh_culling import ViewportCuller
+
+def test_points_outside_the_window_or_not_finite_are_culled():
+    points = np.array([[[0,0],[1.5,-1.5],[3,0]],
+                       [[0,-3],[np.nan,0],[-1,np.inf]]])
+    mask = ViewportCuller(extent=2).get_mask(points)
+
+    np.testing.assert_array_equal(mask.points, [[True,True,False],[False,False,False]])
+
+def test_segments_are_kept_when_crossing_the_window():
+    # Columns: both ends inside, crossing the window, both past the same edge, past different edges
+    points = np.array([[[0,0],[-3,0],[3,0],[-3,0.5]],
+                       [[1,1],[3,0],[5,1],[0.5,3]]])
+    mask = ViewportCuller(extent=2).get_mask(points)
+
+    np.testing.assert_array_equal(mask.alpha_segments, [[True,True,False,True]])
+    assert mask.beta_segments.shape == (2,3)
+
+def test_long_jumps_are_cut():
+    # Grid-line passing a pole, where consecutive points jump across the window
+    points = np.stack((np.array([[-1.9,-1,-0.5,1.8,1.9]]), np.zeros((1,5))), axis=-1)
+    mask = ViewportCuller(extent=2, max_jump=1).get_mask(points)
+
+    np.testing.assert_array_equal(mask.beta_segments, [[True,True,False,True]])
+    assert ViewportCuller(extent=2).get_mask(points).beta_segments.all()
+
+def test_without_extent_only_points_that_are_not_finite_are_culled():
+    points = np.array([[[0.0,0.0],[10.0,10.0],[np.nan,0.0]]])
+    mask = ViewportCuller(extent=None).get_mask(points)
+
+    np.testing.assert_array_equal(mask.points, [[True,True,False]])
+    np.testing.assert_array_equal(mask.beta_segments, [[True,False]])
@@ -0,0 +1,84 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.figure as mpl_figure
+import numpy as np
+
+from src.mesh_plotter import MeshPlotter, PolylineMeshPlotter, RasterMeshPlotter
+
+def line_mesh(alpha : int, beta : int) -> np.ndarray:
+    # Long radial grid-lines spanning the whole window
+    radius, angle = np.linspace(0.1,3,alpha), np.linspace(0,2*np.pi,beta)
+    points = radius[:,None]*np.exp(1j*angle[None,:])
+    return np.stack((points.real,points.imag),axis=-1)
+
+def render(plotter, points) -> np.ndarray:
+    ax = mpl_figure.Figure(figsize=(2,2)).add_subplot(1,1,1)
+    plotter.plot_mesh(points, ax)
+    return ax.get_images()[0].get_array()
+
+
+def test_raster_line_buffers_are_bounded_by_sample_count(monkeypatch):
+    plotter = RasterMeshPlotter(extent=2, resolution=128, chunk_size=256, markersize=0)
+    sizes = []
+    accumulate = plotter._accumulate
+    monkeypatch.setattr(plotter, "_accumulate", lambda layer, pixels, *args: sizes.append(pixels.shape[0]) or accumulate(layer, pixels, *args))
+
+    render(plotter, line_mesh(3, 64))
+
+    # A chunk holds at most chunk_size samples plus one segment, which clipping limits to the raster diagonal
+    assert len(sizes) > 1 and max(sizes) <= 256 + int(np.ceil(np.hypot(128,128))) + 1
+
+def test_raster_output_does_not_depend_on_chunk_size():
+    points = line_mesh(12, 40)
+    small = render(RasterMeshPlotter(extent=2, resolution=96, chunk_size=64), points)
+    large = render(RasterMeshPlotter(extent=2, resolution=96), points)
+
+    np.testing.assert_allclose(small, large, rtol=1e-12, atol=1e-12)
+
+
+def test_segments_join_neighbouring_points():
+    points = line_mesh(4, 5)
+    plotter = MeshPlotter()
+
+    for axis in (0,1):
+        p0, p1 = (points[:-1], points[1:]) if axis == 0 else (points[:,:-1], points[:,1:])
+        expected = np.stack((p0,p1), axis=-2).reshape((-1,2,2))
+        np.testing.assert_array_equal(np.array(list(plotter._get_segments(points, axis))), expected)
+
+        mask = np.arange(expected.shape[0]) % 3 == 0
+        np.testing.assert_array_equal(np.array(list(plotter._get_segments(points, axis, mask))), expected[mask])
+
+def test_vector_plot_uses_one_collection_per_line_family():
+    ax = mpl_figure.Figure(figsize=(2,2)).add_subplot(1,1,1)
+    MeshPlotter(points_color=matplotlib.colormaps["viridis"]).plot_mesh(line_mesh(5, 7), ax)
+
+    alpha_lines, beta_lines, scatter = ax.collections
+    assert len(alpha_lines.get_segments()) == 4*7 and len(beta_lines.get_segments()) == 5*6
+    assert len(scatter.get_offsets()) == 5*7
+
+
+def test_polyline_simplification_stays_within_tolerance():
+    # Densely sampled smooth line, most vertices are redundant at screen resolution
+    x = np.linspace(-1,1,2001)
+    lines = np.stack((x, np.sin(3*x)), axis=-1)[None]*100
+    breaks = np.zeros(lines.shape[:2], dtype=bool)
+    breaks[:,[0,-1]] = True
+
+    plotter = PolylineMeshPlotter(tolerance=0.25)
+    keep = plotter._simplify(lines, breaks)[0]
+    assert keep[0] and keep[-1] and np.count_nonzero(keep) < lines.shape[1]//10
+
+    # Every dropped vertex lies within the tolerance of the simplified path
+    kept = lines[0,keep]
+    for vertex in lines[0,~keep]:
+        a, b = kept[np.searchsorted(kept[:,0], vertex[0])-1], kept[np.searchsorted(kept[:,0], vertex[0])]
+        t = np.clip(np.dot(vertex-a, b-a)/np.dot(b-a, b-a), 0, 1)
+        assert np.hypot(*(vertex - a - t*(b-a))) <= 0.25 + 1e-9
+
+def test_polyline_draws_one_path_per_grid_line():
+    ax = mpl_figure.Figure(figsize=(2,2)).add_subplot(1,1,1)
+    PolylineMeshPlotter(extent=4, markersize=0).plot_mesh(line_mesh(6, 9), ax)
+
+    alpha_lines, beta_lines = ax.collections
+    assert len(alpha_lines.get_paths()) == 9 and len(beta_lines.get_paths()) == 6
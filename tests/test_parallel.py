@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.mapping import ExpressionMapping
+from src.mesh import ParallelEvaluator
+
+@pytest.fixture(scope="module")
+def points() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.uniform(-2,2,(64,48)) + 1j*rng.uniform(-2,2,(64,48))
+
+@pytest.mark.parametrize("pool", ["thread","process"])
+def test_parallel_output_matches_serial_bit_by_bit(pool, points):
+    transformations = [ExpressionMapping("z^3+1/z"), ExpressionMapping("log((1+z)/(1-z))"), np.conj]
+    serial = ParallelEvaluator(1).apply(transformations, points)
+
+    evaluator = ParallelEvaluator(3, pool=pool, min_points=0)
+    try:
+        parallel = evaluator.apply(transformations, points)
+    finally:
+        evaluator.shutdown()
+
+    assert parallel.dtype == serial.dtype
+    np.testing.assert_array_equal(parallel, serial)
+
+def test_small_inputs_are_evaluated_serially(points):
+    evaluator = ParallelEvaluator(4)
+    evaluator.apply([ExpressionMapping("z^2")], points)
+    assert evaluator._executor is None
+
+def test_invalid_pool_is_rejected():
+    with pytest.raises(ValueError):
+        ParallelEvaluator(2, pool="gpu")
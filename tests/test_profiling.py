@@ -0,0 +1,54 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import json
+
+import numpy as np
+
+from holomap import HoloMapConfig, HoloMapFacade
+from src.domain import RadialComplexDomain
+from src.mapping import ExpressionMapping
+from src.mesh import MeshStore, build_domain_mesh
+from src.profiling import Profiler, profiling, profile_stage
+
+
+def test_stages_are_nested_and_totalled():
+    with profiling() as profiler:
+        with profile_stage("outer"):
+            with profile_stage("inner"): pass
+            with profile_stage("inner"): pass
+
+    assert [r.path for r in profiler.records] == ["outer", "outer/inner", "outer/inner"]
+    assert profiler.report()["wall_time_by_stage"]["inner"] == sum(r.wall_time for r in profiler.records[1:])
+
+def test_stages_are_not_recorded_without_profiler():
+    stage = profile_stage("unprofiled")
+    assert stage is profile_stage("other")
+
+    with stage as record:
+        record.record_points(np.zeros(4))
+
+def test_non_finite_points_are_counted():
+    mesh = build_domain_mesh(RadialComplexDomain(), 5, 8, transformations=[ExpressionMapping("1/(z-z)")])
+    with np.errstate(all="ignore"), profiling() as profiler:
+        points = mesh.get_mesh_points()
+
+    mappings = [r for r in profiler.records if r.name == "mappings"][0]
+    assert mappings.points == points.size
+    assert mappings.non_finite == points.size - np.count_nonzero(np.isfinite(points)) == 40
+
+def test_memory_is_traced_on_request():
+    with profiling(Profiler(trace_memory=True)) as profiler:
+        with profile_stage("allocate"):
+            np.ones(2**20)
+
+    assert profiler.records[0].peak_bytes >= 8*2**20
+
+def test_facade_report_covers_render_stages():
+    records = []
+    facade = HoloMapFacade(HoloMapConfig.parse_args(["z^2"]), mesh_store=MeshStore(), profiler=Profiler(on_record=records.append))
+    facade.make_figure()
+
+    report = json.loads(facade.profiler.to_json())
+    assert {"make_figure", "plot_mesh", "meshes", "points", "domain", "mappings", "plot"} <= set(report["wall_time_by_stage"])
+    assert len(records) == len(report["stages"])
@@ -0,0 +1,147 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),"web","pyscript"))
+
+from protocol import RenderClient, encode_message, decode_message, READY
+from scheduler import RenderScheduler
+
+class FakeTimers:
+    # In place of window.setTimeout, timeouts run when the test advances the time
+    def __init__(self):
+        self.now = 0
+        self.timeouts = dict()
+        self._next_id = 0
+
+    def set_timeout(self, callback, delay : int) -> int:
+        self._next_id += 1
+        self.timeouts[self._next_id] = (self.now + delay, callback)
+        return self._next_id
+
+    def clear_timeout(self, timeout_id : int):
+        self.timeouts.pop(timeout_id, None)
+
+    def advance(self, delay : int):
+        self.now += delay
+        for timeout_id, (time, callback) in sorted(self.timeouts.items(), key=lambda t: t[1][0]):
+            if time <= self.now and self.timeouts.pop(timeout_id, None):
+                callback()
+
+class FakeWorker:
+    # Keeps the requests until the test replies to them
+    def __init__(self):
+        self.requests = []
+        self.client = RenderClient(lambda data: self.requests.append(decode_message(data)))
+        self.client.handle(encode_message({"type": READY}))
+
+    def renders(self) -> list:
+        return [r for r in self.requests if r["type"] == "render"]
+
+    def reply(self, request : dict, **reply):
+        self.requests.remove(request)
+        self.client.handle(encode_message({"type": "rendered", "init": "", "trans": "", **reply, "id": request["id"]}))
+
+    def reply_all(self):
+        while self.requests:
+            request = self.requests[0]
+            if request["type"] == "render": self.reply(request, init=str(request["id"]))
+            else: self.reply(request, type="config_updated")
+
+@pytest.fixture
+def setup():
+    timers, worker, results = FakeTimers(), FakeWorker(), []
+    scheduler = RenderScheduler(worker.client, lambda reply, preview: results.append((reply["init"], preview)),
+                                set_timeout=timers.set_timeout, clear_timeout=timers.clear_timeout, delay=100, preview_resolution=0)
+    return scheduler, timers, worker, results
+
+
+def test_rapid_input_is_merged_into_one_render(setup):
+    scheduler, timers, worker, results = setup
+    for resolution in (10, 20, 30):
+        scheduler.update({"mesh_config.alpha_resolution": resolution})
+        scheduler.request_render()
+        timers.advance(50)
+    assert not worker.renders()
+
+    timers.advance(100)
+    assert len(worker.renders()) == 1
+    assert [r["changes"] for r in worker.requests if r["type"] == "update_config"] == [{"mesh_config.alpha_resolution": 30}]
+
+    worker.reply_all()
+    assert len(results) == 1 and not scheduler.busy
+
+def test_input_during_render_waits_for_it(setup):
+    scheduler, timers, worker, results = setup
+    scheduler.request_render()
+    timers.advance(100)
+    first = worker.renders()[0]
+
+    scheduler.update({"plot_config.linewidth": 2.0})
+    scheduler.request_render()
+    timers.advance(100)
+    assert worker.renders() == [first] # Only one render in flight
+
+    # The stale result is dropped and the new input rendered
+    worker.reply(first)
+    assert not results and len(worker.renders()) == 1
+    worker.reply_all()
+    assert len(results) == 1
+
+def test_config_changes_during_render_are_rendered(setup):
+    scheduler, timers, worker, results = setup
+    scheduler.request_render()
+    timers.advance(100)
+
+    # e.g. the reply of a mapping validation, which changes the config without requesting a render
+    scheduler.update({"domain_config.mappings": ["exp(z)"]})
+    worker.reply_all()
+
+    assert len(results) == 1
+    assert not worker.requests and not scheduler.busy
+
+def test_config_changes_alone_do_not_render(setup):
+    scheduler, timers, worker, results = setup
+    scheduler.update({"domain_config.mappings": ["exp(z)"]})
+    timers.advance(1000)
+    assert not worker.requests
+
+    # They are sent with the next render
+    scheduler.request_render()
+    timers.advance(100)
+    assert worker.requests[0] == {"type": "update_config", "changes": {"domain_config.mappings": ["exp(z)"]}, "id": worker.requests[0]["id"]}
+
+def test_cancel_drops_scheduled_and_in_flight_renders(setup):
+    scheduler, timers, worker, results = setup
+    scheduler.request_render()
+    timers.advance(100)
+    scheduler.update({"plot_config.linewidth": 2.0})
+    scheduler.cancel()
+    worker.reply_all()
+    timers.advance(1000)
+
+    assert not results and not worker.requests and not scheduler.busy
+
+def test_previews_precede_high_resolution_renders(setup):
+    scheduler, timers, worker, results = setup
+    scheduler.preview_resolution = 8
+    scheduler.update({"mesh_config.alpha_resolution": 64, "mesh_config.beta_resolution": 4})
+    scheduler.request_render()
+    timers.advance(100)
+
+    updates = [r["changes"] for r in worker.requests if r["type"] == "update_config"]
+    assert updates == [{"mesh_config.alpha_resolution": 8, "mesh_config.beta_resolution": 4}, {"mesh_config.alpha_resolution": 64}]
+
+    worker.reply_all()
+    assert [preview for _, preview in results] == [True, False]
+
+def test_render_errors_are_reported(setup):
+    scheduler, timers, worker, results = setup
+    errors = []
+    scheduler.on_error = errors.append
+    scheduler.request_render()
+    timers.advance(100)
+
+    worker.reply(worker.renders()[0], type="error", message="ValueError")
+    assert [e["message"] for e in errors] == ["ValueError"] and not results and not scheduler.busy
@@ -0,0 +1,74 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import os
+import sys
+import zipfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT,"web"))
+sys.path.insert(0, os.path.join(ROOT,"web","pyscript"))
+
+import build_worker
+from holomap import HoloMapConfig
+from holomap_worker import HoloMapWebFacade
+from protocol import LocalTransport, encode_message, decode_message, RENDER
+
+
+@pytest.fixture
+def transport() -> LocalTransport:
+    return LocalTransport(HoloMapWebFacade(HoloMapConfig.parse_args(["z^2","--alpha_resolution","6","--beta_resolution","6"])))
+
+def reply_of(request) -> dict:
+    replies = []
+    request(on_reply=replies.append, on_error=replies.append)
+    assert len(replies) == 1
+    return replies[0]
+
+
+def test_messages_round_trip_complex_values():
+    message = {"type": RENDER, "id": 3, "changes": {"points": (1+2j, 0.5)}}
+    assert decode_message(encode_message(message)) == {**message, "changes": {"points": [1+2j, 0.5]}}
+
+def test_invalid_messages_are_rejected():
+    with pytest.raises(ValueError):
+        encode_message({"type": "shutdown"})
+    with pytest.raises(TypeError):
+        encode_message({"type": RENDER, "format": object()})
+
+def test_worker_updates_config(transport):
+    reply = reply_of(lambda **callbacks: transport.client.update_config({"mesh_config.alpha_resolution": 9, "domain_config.mappings": ["exp(z)"]}, **callbacks))
+
+    assert reply["type"] == "config_updated" and reply["paths"] == ["mesh_config.alpha_resolution", "domain_config.mappings"]
+    assert transport.worker.facade.config.mesh_config.alpha_resolution == 9
+
+def test_worker_validates_mappings(transport):
+    reply = reply_of(lambda **callbacks: transport.client.validate_mappings(["z^2", "exp(z, z)", "z^", "sin(z)/z"], **callbacks))
+    assert reply["valid"] == [True, False, False, True]
+
+def test_worker_renders(transport):
+    reply = reply_of(lambda **callbacks: transport.client.render("svg", **callbacks))
+
+    assert reply["type"] == "rendered" and reply["format"] == "svg"
+    assert reply["init"].lstrip().startswith("<?xml") and "<svg" in reply["trans"]
+    assert transport.client.pending == 0
+
+def test_worker_errors_are_replied(transport):
+    transport.client.update_config({"domain_config.mappings": ["exp(z, z)"]})
+    reply = reply_of(lambda **callbacks: transport.client.render("svg", **callbacks))
+
+    assert reply["type"] == "error" and reply["message"].startswith("ValueError")
+
+
+def test_worker_files_match_sources():
+    # The worker loads the library from web/res/python, rebuilt with web/build_worker.py
+    with open(os.path.join(ROOT,"holomap.py"),"rb") as f, open(os.path.join(build_worker.OUTPUT,"holomap.py"),"rb") as g:
+        assert f.read() == g.read()
+
+    with zipfile.ZipFile(os.path.join(build_worker.OUTPUT,"src.zip")) as archive:
+        assert sorted(archive.namelist()) == sorted(path.replace(os.sep,"/") for path in build_worker.source_files())
+        for path in build_worker.source_files():
+            with open(os.path.join(ROOT,path),"rb") as f:
+                assert archive.read(path.replace(os.sep,"/")) == f.read(), path
@@ -0,0 +1,31 @@
+import os
+import shutil
+import zipfile
+
+# Copies the library into web/res/python, which the render worker loads (see pyscript/worker_config.json).
+# Run after changing holomap.py or src, the worker otherwise renders with the previous version.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT = os.path.join(ROOT,"web","res","python")
+
+def source_files() -> list[str]:
+    # Sources of the src package relative to the root, compiled files are left out
+    files = []
+    for directory, subdirectories, names in os.walk(os.path.join(ROOT,"src")):
+        subdirectories[:] = sorted(d for d in subdirectories if d != "__pycache__")
+        files += [os.path.relpath(os.path.join(directory,name),ROOT) for name in sorted(names) if name.endswith(".py")]
+
+    return files
+
+def build(output : str = OUTPUT):
+    os.makedirs(output, exist_ok=True)
+    shutil.copyfile(os.path.join(ROOT,"holomap.py"), os.path.join(output,"holomap.py"))
+
+    # Fixed timestamps, so that the archive only changes with the sources
+    with zipfile.ZipFile(os.path.join(output,"src.zip"),"w",compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in source_files():
+            with open(os.path.join(ROOT,path),"rb") as f:
+                archive.writestr(zipfile.ZipInfo(path.replace(os.sep,"/"),date_time=(1980,1,1,0,0,0)), f.read(), compress_type=zipfile.ZIP_DEFLATED)
+
+
+if __name__ == "__main__":
+    build()
@@ -1,18 +1,14 @@
-from holomap import  HoloMapFacade
+from holomap import HoloMapFacade, HoloMapConfig
+from protocol import RenderWorker
 
 import matplotlib as mpl
 import matplotlib.figure as mpl_figure
 import matplotlib.pyplot as plt
 
-import pyscript
-from pyscript.ffi import create_proxy
-
 from io import StringIO
 
 import typing
 
-pyscript.window.console.log("hi")
-
 class HoloMapWebFacade(HoloMapFacade):
 
     def update_config(self, config_path : str, config_value : typing.Any):
@@ -24,25 +20,30 @@ class HoloMapWebFacade(HoloMapFacade):
 
         setattr(config_namespace,config_path[-1],config_value)
 
-    def get_plot_data(self,format="svg") -> typing.Tuple[bytes, bytes]:
-        fig_init = mpl_figure.Figure(figsize=(4,4),dpi=self.config.figure_config.dpi,layout="tight")
-        fig_trans = mpl_figure.Figure(figsize=(4,4),dpi=self.config.figure_config.dpi,layout="tight")
+    def get_options(self) -> typing.Dict[str, typing.List[str]]:
+        # Choices only known to matplotlib, which the page does not load
+        return {"styles": ["default",*plt.style.available], "colormaps": list(mpl.colormaps)}
 
-        ax_init, ax_trans = fig_init.add_subplot(1,1,1), fig_trans.add_subplot(1,1,1)
-        
-        self.plot_mesh(ax_init, ax_trans)
+    def get_plot_data(self, format="svg") -> typing.Tuple[str, str]:
+        with plt.style.context(self.config.plot_config.plot_style):
+            fig_init = mpl_figure.Figure(figsize=(4,4),dpi=self.config.figure_config.dpi,layout="tight")
+            fig_trans = mpl_figure.Figure(figsize=(4,4),dpi=self.config.figure_config.dpi,layout="tight")
 
-        io_init, io_trans = StringIO(), StringIO()
-        fig_init.savefig(io_init,format=format), fig_trans.savefig(io_trans,format=format)
+            ax_init, ax_trans = fig_init.add_subplot(1,1,1), fig_trans.add_subplot(1,1,1)
 
-        pyscript.window.console.log(io_init.getvalue())
+            self.plot_mesh(ax_init, ax_trans)
 
-holomap_facade = HoloMapWebFacade()
+            io_init, io_trans = StringIO(), StringIO()
+            fig_init.savefig(io_init,format=format), fig_trans.savefig(io_trans,format=format)
 
-def update_config(config_path : str, config_value : typing.Any): holomap_facade.update_config(config_path,config_value)
-def get_plot_data(format="svg"): return holomap_facade.get_plot_data(format)
+        return io_init.getvalue(), io_trans.getvalue()
 
-pyscript.document.querySelector("#disk-button").addEventListener("click",lambda x: pyscript.window.console.log("hi"))
 
-__export__ = ["update_config","get_plot_data"]
+if __name__ == "__main__":
+    # Only reachable as a pyscript worker, the page talks to it through protocol messages
+    from polyscript import xworker
+    from pyscript.ffi import create_proxy
 
+    render_worker = RenderWorker(HoloMapWebFacade(HoloMapConfig()), xworker.postMessage)
+    xworker.onmessage = create_proxy(lambda event: render_worker.handle(event.data))
+    render_worker.start()
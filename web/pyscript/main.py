@@ -1,30 +1,31 @@
-from holomap import HoloMapFacade, HoloMapConfig
+from protocol import RenderClient
+from scheduler import RenderScheduler
 
-from pyscript import document, window, display
+from pyscript import document, window, PyWorker
 import pyscript.web as pysweb
-from pyodide.ffi import create_proxy
-
-import matplotlib as mpl
-import matplotlib.figure as mpl_figure
-import matplotlib.axes as mpl_axes
-import matplotlib.pyplot as plt
-
-import scipy
-
-from io import StringIO
+from pyodide.ffi import create_proxy, create_once_callable
 
 import operator as op
 
 import collections.abc as  abc
 
+import typing
+
 class HoloMapWebEventHandler:
 
-    def __init__(self, document, holomap : HoloMapFacade, *,plot_format="svg"):
+    def __init__(self, document, client : RenderClient, *,plot_format="svg"):
 
         self.document = document
-        self.holomap = holomap
+        self.client = client # Renders in the worker, the page only swaps the images
         self.plot_format = plot_format
 
+        # Rapid input is merged into a single render, a quick low resolution one is shown while it completes
+        self.scheduler = RenderScheduler(client, self._show_plots,
+            set_timeout=lambda callback, delay: window.setTimeout(create_once_callable(callback),delay),
+            clear_timeout=window.clearTimeout,
+            on_error=self._log_error,
+            format=plot_format)
+
         self.valid_mappings = True
 
         self._acquire_HTML_elements()
@@ -95,13 +96,16 @@ class HoloMapWebEventHandler:
         self._update_config()
 
     def update_elements(self):
+        self.client.get_options(on_reply=self._add_options)
+
+    def _add_options(self, options : dict):
         # Add plot styles
         for ch in self.plot_style.children: ch.remove()
 
-        for style in ["default",*plt.style.available]:
+        for style in options["styles"]:
             self.plot_style.append(pysweb.option(style,value=style)._dom_element)
 
-        for cmap in mpl.colormaps:
+        for cmap in options["colormaps"]:
             self.marker_colormap.append(pysweb.option(cmap,value=cmap)._dom_element)
             self.grid_colormap.append(pysweb.option(cmap,value=cmap)._dom_element)
 
@@ -131,11 +135,11 @@ class HoloMapWebEventHandler:
 
         if event.target.id in map(op.attrgetter("id"),self.sampling_method):
             button_group = self.sampling_method
-            self.holomap.config.mesh_config.sampling_method = event.target.value.lower()
+            self._set_config({"mesh_config.sampling_method": event.target.value.lower()})
 
         else:
             button_group = self.paint_parameter
-            self.holomap.config.plot_config.paint_parameter = event.target.value.lower()
+            self._set_config({"plot_config.paint_parameter": event.target.value.lower()})
 
         self._update_button_group_state(button_group,event.target)
 
@@ -158,45 +162,44 @@ class HoloMapWebEventHandler:
 
     def change_primitive_domain(self, event):
 
-        self.holomap.config.domain_config.primitive_domain = event.target.value.replace("-","_").lower()
+        self._set_config({"domain_config.primitive_domain": event.target.value.replace("-","_").lower()})
         self._update_button_group_state(self.domain, event.target)
 
         self.update()
 
     def update_transformations(self, event):
-        # Obtain mappings
-        self.valid_mappings = True
-
-        mappings = []
-        to_be_removed = []
-        for ta in event.currentTarget.children:
-            # window.console.log(ta)
+        # The event target is only set while dispatching, so it is kept for the validation reply
+        container = event.currentTarget
+        fields = []
+        for ta in list(container.children):
             if not ta.value:
-                to_be_removed.append(ta)
+                ta.remove()
             else:
-                try:
-                    self.holomap.parse_mapping(ta.value)
-                    mappings.append(ta.value)
-                    ta.classList.remove("wrong_field")
-                except ValueError:
-                    self.valid_mappings = False
-                    ta.classList.add("wrong_field")
-
-        for tbr in to_be_removed:
-            tbr.remove()
+                fields.append(ta)
 
         # Add new field
         new_input = pysweb.input_(type="text",placeholder="f(z)")
-        event.currentTarget.append(new_input._dom_element)
+        container.append(new_input._dom_element)
+
+        self.client.validate_mappings([ta.value for ta in fields], on_reply=lambda reply: self._apply_transformations(container, fields, reply["valid"]))
+
+    def _apply_transformations(self, container, fields : list, valid : typing.List[bool]):
+        for ta, v in zip(fields,valid):
+            if v:
+                ta.classList.remove("wrong_field")
+            else:
+                ta.classList.add("wrong_field")
 
+        self.valid_mappings = all(valid)
         if not self.valid_mappings:
             return
 
         # Update Mappings
-        if self.input_container.contains(event.currentTarget):
-            self.holomap.config.domain_config.primitive_domain_mappings = mappings
+        mappings = [ta.value for ta in fields]
+        if self.input_container.contains(container):
+            self._set_config({"domain_config.primitive_domain_mappings": mappings})
         else:
-            self.holomap.config.domain_config.mappings = mappings
+            self._set_config({"domain_config.mappings": mappings})
 
 
     # Other methods
@@ -205,28 +208,34 @@ class HoloMapWebEventHandler:
         self.redraw_plots()
 
     def _update_config(self):
-        self.holomap.config.mesh_config.alpha_resolution = int(self.alpha_resolution.value)
-        self.holomap.config.mesh_config.beta_resolution = int(self.beta_resolution.value)
-        self.holomap.config.mesh_config.alpha_accumulate_values = list(map(float,filter(bool,self.alpha_accumulation_values.value.split(","))))
-        self.holomap.config.mesh_config.beta_accumulate_values = list(map(float,filter(bool,self.beta_accumulation_values.value.split(","))))
-        self.holomap.config.mesh_config.alpha_accumulate_concentration = float(self.alpha_concentration.value)
-        self.holomap.config.mesh_config.beta_accumulate_concentration = float(self.beta_concentration.value)
-        self.holomap.config.mesh_config.mesh_accumulate_points = list(map(complex,filter(bool,self.mesh_accumulation_points.value.split(","))))
-        self.holomap.config.mesh_config.mesh_accumulate_sharpness = float(self.mesh_accumulation_sharpness.value)
-
-        self.holomap.config.plot_config.plot_style = self.plot_style.value or "default"
-        self.holomap.config.plot_config.markersize = 2**float(self.markersize.value)
-        self.holomap.config.plot_config.linewidth = 2**float(self.linewidth.value)
-        self.holomap.config.plot_config.points_color = self.marker_color.value if self.marker_color_mode.value == "single" else self.marker_colormap.value
-        self.holomap.config.plot_config.grid_color = self.grid_color.value if self.grid_color_mode.value == "single" else self.grid_colormap.value
-
-        self.holomap.config.axes_config.axis_linewidth = 2**float(self.axis_linewdith.value)
-        self.holomap.config.axes_config.axis_line_color = self.axis_color.value
-        self.holomap.config.axes_config.axis_scale = 2**float(self.axis_scale.value)
-        self.holomap.config.axes_config.axis_tickrate = 2**float(self.axis_tickrate.value)
-        self.holomap.config.axes_config.show_ticks = self.show_ticks.checked
-        self.holomap.config.axes_config.show_grid = self.show_grid.checked
-        self.holomap.config.axes_config.show_spines = self.show_spines.checked
+        self._set_config({
+            "mesh_config.alpha_resolution": int(self.alpha_resolution.value),
+            "mesh_config.beta_resolution": int(self.beta_resolution.value),
+            "mesh_config.alpha_accumulate_values": list(map(float,filter(bool,self.alpha_accumulation_values.value.split(",")))),
+            "mesh_config.beta_accumulate_values": list(map(float,filter(bool,self.beta_accumulation_values.value.split(",")))),
+            "mesh_config.alpha_accumulate_concentration": float(self.alpha_concentration.value),
+            "mesh_config.beta_accumulate_concentration": float(self.beta_concentration.value),
+            "mesh_config.mesh_accumulate_points": list(map(complex,filter(bool,self.mesh_accumulation_points.value.split(",")))),
+            "mesh_config.mesh_accumulate_sharpness": float(self.mesh_accumulation_sharpness.value),
+            "plot_config.plot_style": self.plot_style.value or "default",
+            "plot_config.markersize": 2**float(self.markersize.value),
+            "plot_config.linewidth": 2**float(self.linewidth.value),
+            "plot_config.points_color": self.marker_color.value if self.marker_color_mode.value == "single" else self.marker_colormap.value,
+            "plot_config.grid_color": self.grid_color.value if self.grid_color_mode.value == "single" else self.grid_colormap.value,
+            "axes_config.axis_linewidth": 2**float(self.axis_linewdith.value),
+            "axes_config.axis_line_color": self.axis_color.value,
+            "axes_config.axis_scale": 2**float(self.axis_scale.value),
+            "axes_config.axis_tickrate": 2**float(self.axis_tickrate.value),
+            "axes_config.show_ticks": self.show_ticks.checked,
+            "axes_config.show_grid": self.show_grid.checked,
+            "axes_config.show_spines": self.show_spines.checked,
+        })
+
+    def _set_config(self, changes : typing.Dict[str, typing.Any]):
+        self.scheduler.update(changes)
+
+    def _log_error(self, reply : dict):
+        window.console.error(reply["traceback"])
 
     def _update_button_group_state(self, button_group, new_selected):
         for button in button_group:
@@ -238,44 +247,33 @@ class HoloMapWebEventHandler:
         if not self.valid_mappings:
             return
 
-        # Remove previous plots if they exist
-        left_plot_svg = self.left_plot_container.querySelector("svg")
-        right_plot_svg = self.right_plot_container.querySelector("svg")
-
-        if left_plot_svg: left_plot_svg.remove()
-        if right_plot_svg: right_plot_svg.remove()
-
-        # Instantiate figures
-        plt.style.use(self.holomap.config.plot_config.plot_style) # Set style
-        fig_init = mpl_figure.Figure(figsize=(4,4),dpi=self.holomap.config.figure_config.dpi,layout="tight")
-        fig_trans = mpl_figure.Figure(figsize=(4,4),dpi=self.holomap.config.figure_config.dpi,layout="tight")
-
-        # Make axes
-        ax_init, ax_trans = fig_init.add_subplot(1,1,1), fig_trans.add_subplot(1,1,1)
+        self.scheduler.request_render()
 
-        # Do the plotting
-        self.holomap.plot_mesh(ax_init, ax_trans)
+    def _show_plots(self, reply : dict, preview : bool = False):
+        for container, image in ((self.left_plot_container, reply["init"]), (self.right_plot_container, reply["trans"])):
+            # Remove previous plot if it exists
+            plot_svg = container.querySelector("svg")
+            if plot_svg: plot_svg.remove()
 
-        # Save and serialize the figures
-        io_init, io_trans = StringIO(), StringIO()
-        fig_init.savefig(io_init,format=self.plot_format), fig_trans.savefig(io_trans,format=self.plot_format)
+            # Insert image into document
+            container.insertAdjacentHTML("afterbegin",image)
 
-        # Insert images into document
-        self.left_plot_container.insertAdjacentHTML("afterbegin",io_init.getvalue())
-        self.right_plot_container.insertAdjacentHTML("afterbegin",io_trans.getvalue())
+            # Remove unnecessary attributes
+            plot_svg = container.querySelector("svg")
+            plot_svg.removeAttribute("width")
+            plot_svg.removeAttribute("height")
 
-        # Remove unnecessary attributes
-        left_plot_svg = self.left_plot_container.querySelector("svg")
-        left_plot_svg.removeAttribute("width")
-        left_plot_svg.removeAttribute("height")
+            # Previews are dimmed until the full resolution render replaces them
+            container.classList.toggle("preview", preview)
 
-        right_plot_svg = self.right_plot_container.querySelector("svg")
-        right_plot_svg.removeAttribute("width")
-        right_plot_svg.removeAttribute("height")
 
 
+# Messages sent before the worker has loaded its packages are queued by the client
+worker = PyWorker("./pyscript/holomap_worker.py", type="pyodide", config="./pyscript/worker_config.json")
+client = RenderClient(worker.postMessage)
+worker.onmessage = create_proxy(lambda event: client.handle(event.data))
 
-event_handler = HoloMapWebEventHandler(document, HoloMapFacade(HoloMapConfig()))
+event_handler = HoloMapWebEventHandler(document, client)
 event_handler.update_elements()
 event_handler.redraw_plots()
 event_handler.attach_listeners()
@@ -0,0 +1,163 @@
+import json
+import traceback
+
+import typing
+
+# Messages exchanged between the page and the render worker. Every message is a JSON object with a "type",
+# requests also carry an "id" which the worker copies into its reply. Pyscript is not imported here, so that
+# the protocol runs unchanged under CPython with a LocalTransport in place of the worker.
+
+# Requests (page -> worker)
+UPDATE_CONFIG = "update_config"
+VALIDATE_MAPPINGS = "validate_mappings"
+GET_OPTIONS = "get_options"
+RENDER = "render"
+
+# Replies (worker -> page)
+READY = "ready"
+CONFIG_UPDATED = "config_updated"
+MAPPINGS_VALIDATED = "mappings_validated"
+OPTIONS = "options"
+RENDERED = "rendered"
+ERROR = "error"
+
+REQUESTS = (UPDATE_CONFIG, VALIDATE_MAPPINGS, GET_OPTIONS, RENDER)
+REPLIES = (READY, CONFIG_UPDATED, MAPPINGS_VALIDATED, OPTIONS, RENDERED, ERROR)
+
+Message = typing.Dict[str, typing.Any]
+
+def _encode_value(value : typing.Any) -> typing.Any:
+    # Config values may be complex (e.g. accumulation points), which JSON cannot represent
+    if isinstance(value, complex):
+        return {"__complex__": [value.real, value.imag]}
+
+    raise TypeError("""Value {!r} cannot be sent to the worker.""".format(value))
+
+def _decode_object(obj : dict) -> typing.Any:
+    return complex(*obj["__complex__"]) if obj.keys() == {"__complex__"} else obj
+
+def encode_message(message : Message) -> str:
+    if message.get("type") not in (*REQUESTS, *REPLIES):
+        raise ValueError("""Message type "{}" not valid.""".format(message.get("type")))
+
+    return json.dumps(message, default=_encode_value)
+
+def decode_message(data : str) -> Message:
+    message = json.loads(data, object_hook=_decode_object)
+    if not isinstance(message, dict) or message.get("type") not in (*REQUESTS, *REPLIES):
+        raise ValueError("""Message {!r} not valid.""".format(data[:80]))
+
+    return message
+
+
+class RenderWorker:
+    # Worker side of the protocol, answers every request with a single reply using the facade
+
+    def __init__(self, facade : typing.Any, post : typing.Callable[[str],None]):
+        # The facade must provide update_config, parse_mapping, get_options and get_plot_data
+        self.facade = facade
+        self.post = post
+
+    def start(self):
+        self.post(encode_message({"type": READY}))
+
+    def handle(self, data : str):
+        message = decode_message(data)
+        try:
+            reply = self._reply(message)
+        except Exception as e:
+            reply = {"type": ERROR, "message": "{}: {}".format(type(e).__name__, e), "traceback": traceback.format_exc()}
+
+        reply["id"] = message.get("id")
+        self.post(encode_message(reply))
+
+    def _reply(self, message : Message) -> Message:
+        match message["type"]:
+            case "update_config":
+                for path, value in message["changes"].items():
+                    self.facade.update_config(path, value)
+                return {"type": CONFIG_UPDATED, "paths": list(message["changes"])}
+
+            case "validate_mappings":
+                return {"type": MAPPINGS_VALIDATED, "valid": [self._is_valid_mapping(m) for m in message["mappings"]]}
+
+            case "get_options":
+                return {"type": OPTIONS, **self.facade.get_options()}
+
+            case "render":
+                init, trans = self.facade.get_plot_data(message.get("format","svg"))
+                return {"type": RENDERED, "format": message.get("format","svg"), "init": init, "trans": trans}
+
+        raise ValueError("""Message type "{}" is not a request.""".format(message["type"]))
+
+    def _is_valid_mapping(self, mapping : str) -> bool:
+        try:
+            self.facade.parse_mapping(mapping)
+        except ValueError:
+            return False
+
+        return True
+
+
+class RenderClient:
+    # Page side of the protocol, sends requests and calls back with the matching reply
+
+    def __init__(self, post : typing.Callable[[str],None]):
+        self.post = post
+        self.ready = False
+
+        self._next_id = 0
+        self._callbacks : typing.Dict[int, typing.Tuple[typing.Callable, typing.Callable]] = dict()
+        self._queued : typing.List[str] = list() # Sent once the worker is ready
+
+    def request(self, message : Message, on_reply : typing.Callable[[Message],None] = None, on_error : typing.Callable[[Message],None] = None) -> int:
+        request_id = self._next_id
+        self._next_id += 1
+
+        self._callbacks[request_id] = (on_reply, on_error)
+        data = encode_message({**message, "id": request_id})
+        if self.ready:
+            self.post(data)
+        else:
+            self._queued.append(data)
+
+        return request_id
+
+    def update_config(self, changes : typing.Dict[str, typing.Any], **callbacks) -> int:
+        return self.request({"type": UPDATE_CONFIG, "changes": changes}, **callbacks)
+
+    def validate_mappings(self, mappings : typing.List[str], **callbacks) -> int:
+        return self.request({"type": VALIDATE_MAPPINGS, "mappings": list(mappings)}, **callbacks)
+
+    def get_options(self, **callbacks) -> int:
+        return self.request({"type": GET_OPTIONS}, **callbacks)
+
+    def render(self, format : str = "svg", **callbacks) -> int:
+        return self.request({"type": RENDER, "format": format}, **callbacks)
+
+    @property
+    def pending(self) -> int:
+        return len(self._callbacks)
+
+    def handle(self, data : str):
+        message = decode_message(data)
+        if message["type"] == READY:
+            self.ready = True
+            for queued in self._queued: self.post(queued)
+            self._queued.clear()
+            return
+
+        on_reply, on_error = self._callbacks.pop(message.get("id"), (None, None))
+        callback = on_error if message["type"] == ERROR else on_reply
+        if callback is not None:
+            callback(message)
+
+
+class LocalTransport:
+    # Connects a client and a worker in the same interpreter, in place of a web worker (e.g. under CPython)
+
+    def __init__(self, facade : typing.Any):
+        self.client = RenderClient(lambda data: self.worker.handle(data))
+        self.worker = RenderWorker(facade, lambda data: self.client.handle(data))
+
+        self.worker.start()
@@ -0,0 +1,123 @@
+from protocol import RenderClient, Message
+
+import typing
+
+RESOLUTIONS = ("mesh_config.alpha_resolution","mesh_config.beta_resolution")
+
+class RenderScheduler:
+    # Collects config changes and render requests from the page and turns them into as few worker renders as possible.
+    # Input is debounced, changes made in the meantime are sent together, and at most one render is in flight: the
+    # worker cannot stop a render, so later input waits for it and its now stale result is dropped. The generation
+    # counter grows with every input, a result is only shown if no input arrived after its render was requested.
+    # Config changes alone do not render, unless they make the render in flight stale: it is then rendered again with them.
+
+    def __init__(self,
+                 client : RenderClient,
+                 on_result : typing.Callable[[Message,bool],None],
+                 *,
+                 set_timeout : typing.Callable[[typing.Callable,int],typing.Any],
+                 clear_timeout : typing.Callable[[typing.Any],None],
+                 on_error : typing.Callable[[Message],None] = None,
+                 delay : int = 150,
+                 preview_resolution : int = 16,
+                 format : str = "svg"):
+        # Timeouts are passed in (window.setTimeout in the browser) so that the scheduler runs outside of it.
+        # Renders above preview_resolution are preceded by one at that resolution, 0 disables previews.
+        self.client = client
+        self.on_result = on_result # Called with the render reply and whether it is a preview
+        self.on_error = on_error
+        self.set_timeout = set_timeout
+        self.clear_timeout = clear_timeout
+        self.delay = delay
+        self.preview_resolution = preview_resolution
+        self.format = format
+
+        self.generation = 0
+
+        self._pending_changes : typing.Dict[str, typing.Any] = dict()
+        self._resolutions : typing.Dict[str, int] = dict() # Last sent, to scale previews from
+        self._render_requested = False
+        self._timer = None
+        self._in_flight = False
+        self._sent_generation = None # Of the render in flight
+
+    def update(self, changes : typing.Dict[str, typing.Any]):
+        # Config changes are sent with the next render, later values of a path replace earlier ones
+        self._pending_changes.update(changes)
+
+        # The render in flight would otherwise be dropped without a render to replace it
+        if self._in_flight and self._sent_generation == self.generation:
+            self._render_requested = True
+            self.generation += 1
+
+    def request_render(self):
+        self._render_requested = True
+        self.generation += 1
+
+        if self._timer is not None:
+            self.clear_timeout(self._timer)
+        self._timer = self.set_timeout(self._flush, self.delay)
+
+    def cancel(self):
+        # Drop the scheduled render and the result of the one in flight, pending changes are kept for the next render
+        if self._timer is not None:
+            self.clear_timeout(self._timer)
+            self._timer = None
+
+        self._render_requested = False
+        self.generation += 1
+
+    @property
+    def busy(self) -> bool:
+        return self._in_flight or self._timer is not None
+
+    def _flush(self):
+        self._timer = None
+        if not self._in_flight and self._render_requested:
+            self._send()
+
+    def _send(self):
+        generation = self._sent_generation = self.generation
+        changes, self._pending_changes = self._pending_changes, dict()
+        self._render_requested = False
+        self._in_flight = True
+
+        self._resolutions.update((path, changes[path]) for path in RESOLUTIONS if path in changes)
+        preview = {path: self.preview_resolution for path in RESOLUTIONS if self._resolutions.get(path,0) > self.preview_resolution}
+
+        # The worker handles messages in order, so the preview is rendered first and the full resolution restored after it
+        if self.preview_resolution and preview:
+            self.client.update_config({**changes, **preview}, on_error=self._on_error)
+            self.client.render(self.format, on_reply=lambda reply: self._on_preview(generation, reply), on_error=self._on_error)
+            changes = {path: self._resolutions[path] for path in preview}
+
+        if changes:
+            self.client.update_config(changes, on_error=self._on_error)
+        self.client.render(self.format, on_reply=lambda reply: self._on_render(generation, reply), on_error=lambda reply: self._on_render_error(generation, reply))
+
+    def _on_preview(self, generation : int, reply : Message):
+        if generation == self.generation:
+            self.on_result(reply, True)
+
+    def _on_render(self, generation : int, reply : Message):
+        self._in_flight = False
+        if generation == self.generation:
+            self.on_result(reply, False)
+
+        self._send_waiting()
+
+    def _on_render_error(self, generation : int, reply : Message):
+        self._in_flight = False
+        if generation == self.generation:
+            self._on_error(reply)
+
+        self._send_waiting()
+
+    def _send_waiting(self):
+        # Input that arrived while rendering is sent once its debounce is over
+        if self._render_requested and self._timer is None:
+            self._send()
+
+    def _on_error(self, reply : Message):
+        if self.on_error is not None:
+            self.on_error(reply)
@@ -1,17 +1,18 @@
 from src.domain import RadialComplexDomain, QuadrantsComplexDomain
-from src.mesh import build_domain_mesh
-from src.mesh.mesh import ComplexToMesh2D
-from src.mesh_plotter import MeshPlotter
+from src.mesh import build_domain_mesh, shared_evaluation, ParallelEvaluator, MeshStore, DiskMeshStore, default_mesh_store, hash_key
+from src.mesh.mesh import ComplexToMesh2D, TransformedMesh, CachedMesh
+from src.mesh_culling import ViewportCuller
+from src.mapping import ExpressionMapping
+from src.profiling import Profiler, profiling, profile_stage
 
 import numpy as np
-import sympy
 
-import re
-
-import matplotlib as mpl
-import matplotlib.figure as mpl_figure
-import matplotlib.axes as mpl_axes
-import matplotlib.pyplot as plt
+import os
+import copy
+import contextlib
+import functools
+import operator as op
+import argparse
 
 import dataclasses
 from dataclasses import dataclass, field
@@ -19,6 +20,24 @@ from dataclassparse_txetx import ConfigGroupDataclass, SelfParsingDataclass
 
 import typing
 
+# Matplotlib and the plotters are imported when a figure is drawn, so that parsing the config stays fast
+if typing.TYPE_CHECKING:
+    import matplotlib.figure as mpl_figure
+    import matplotlib.axes as mpl_axes
+
+def _plot_style(style : str) -> str:
+    # Checked in place of argparse choices, which would list the styles on every --help. The default is also converted by argparse
+    if style == "default":
+        return style
+
+    import matplotlib.style
+
+    styles = ("default",*matplotlib.style.available)
+    if style not in styles:
+        raise argparse.ArgumentTypeError("invalid choice: {!r} (choose from {})".format(style,", ".join(styles)))
+
+    return style
+
 @dataclass(kw_only=True)
 class HoloMapConfig(SelfParsingDataclass):
 
@@ -26,7 +45,7 @@ class HoloMapConfig(SelfParsingDataclass):
     class DomainConfig(ConfigGroupDataclass):
         _config_group_title = "DOMAIN"
 
-        mappings : tuple[str,...] = field(default_factory=tuple,metadata={"help":"Functions to apply to the initial domain (as a function of one of x, y or z). Supports the python built-in complex operations and the numpy library functions. Common math notation and constants (pi, e, i) are also allowed.","nargs":"+"})
+        mappings : tuple[str,...] = field(default_factory=tuple,metadata={"help":"Functions to apply to the initial domain (as a function of one of x, y or z). Supports the arithmetic operators and the elementary complex functions (exp, log, sqrt, sin, arcsin, sinh, abs, angle, ...). Common math notation and constants (pi, e, i) are also allowed.","nargs":"+"})
 
         _: dataclasses.KW_ONLY
         primitive_domain : typing.Literal["disk","half_plane","half_disk","quadrant"] = field(default="disk",metadata={"help":"Primitive domain to use as a primer for the starting domain."})
@@ -40,7 +59,13 @@ class HoloMapConfig(SelfParsingDataclass):
 
         alpha_resolution : int = field(default=16,metadata={"help":"Resolution in alpha-space at which to sample the domain."})
         beta_resolution : int = field(default=16,metadata={"help":"Resolution in beta-space at which to sample the domain."})
-        sampling_method : typing.Literal["uniform","random"] = field(default="uniform",metadata={"help":"Method for sampling the domain in parameter space."})
+        sampling_method : typing.Literal["uniform","random","sobol","halton","adaptive"] = field(default="uniform",metadata={"help":"Method for sampling the domain in parameter space. Sobol and Halton sampling are scrambled low-discrepancy sequences, which cover the domain more evenly than random sampling. Adaptive sampling starts from a uniform grid and inserts grid-lines where the transformed mesh is coarse."})
+        seed : int = field(default=-1,metadata={"help":"Seed for the random, sobol and halton sampling methods, the same seed always gives the same mesh. Negative values draw a new seed for every run."})
+        line_samples : int = field(default=0,metadata={"help":"Number of samples along every grid-line, independently of the number of grid-lines given by the resolutions. Each family of grid-lines is evaluated on its own, mesh-points are kept at the grid-line intersections. Set to 0 to sample grid-lines only at the mesh-points."})
+        adaptive_max_points : int = field(default=65536,metadata={"help":"Maximum number of mesh-points for adaptive sampling."})
+        adaptive_max_distance : float = field(default=0.05,metadata={"help":"Adaptive sampling refines the mesh until neighbouring transformed mesh-points are closer than this distance."})
+        adaptive_max_angle : float = field(default=10,metadata={"help":"Adaptive sampling refines the mesh until transformed grid-lines turn by less than this angle (in degrees) at every mesh-point."})
+        dtype : typing.Literal["complex128","complex64"] = field(default="complex128",metadata={"help":"Precision of the mesh points. Single precision (complex64) halves memory use, points that overflow are reported."})
 
         alpha_accumulate_values : tuple[float,...] = field(default_factory=tuple, metadata={"help":"""Accumulate "alpha" domain sampling parameter at given values (between 0 and 1).""","nargs":"+"})
         beta_accumulate_values : tuple[float,...] = field(default_factory=tuple, metadata={"help":"""Accumulate "beta" domain sampling parameter at given values (between 0 and 1).""","nargs":"+"})
@@ -49,17 +74,27 @@ class HoloMapConfig(SelfParsingDataclass):
 
         mesh_accumulate_points : tuple[complex,...] = field(default_factory=tuple, metadata={"help":"""Locations in the complex plane which attract mesh points in order to produce accumulation around them.""","nargs":"+"})
         mesh_accumulate_sharpness : float = field(default=2, metadata={"help":"""Sharpness factor for gaussian accumulation."""})
+        mesh_accumulate_cutoff : float = field(default=0, metadata={"help":"""Ignore accumulation points further than this many gaussian widths (1/sharpness) from a mesh-point. Set to 0 to use every point."""})
+
+        workers : int = field(default=1, metadata={"help":"""Number of workers used to evaluate the mappings in parallel (0 uses all cores)."""})
+        worker_pool : typing.Literal["thread","process"] = field(default="thread", metadata={"help":"""Kind of worker pool used when evaluating in parallel."""})
+        backend : typing.Literal["numpy","numexpr","numba"] = field(default="numpy", metadata={"help":"""Library used to evaluate the mappings. Numexpr and numba evaluate them multi-threaded, numpy is used instead when they are not installed, do not support a mapping or do not reproduce the numpy result."""})
 
     @dataclass(kw_only=True)
     class PlotConfig(ConfigGroupDataclass):
         _config_group_title = "PLOT"
 
-        plot_style : str = field(default="default",metadata={"help":"""Style of plotting to use.""","choices":("default",*plt.style.available)})
+        plot_style : str = field(default="default",metadata={"help":"""Style of plotting to use, one of the matplotlib styles.""","type":_plot_style,"metavar":"STYLE"})
         markersize : float = field(default=1,metadata={"help":"""Size of markers of mesh-points."""})
         linewidth : float = field(default=0.1,metadata={"help":"""Width of grid-lines."""})
         points_color : str = field(default="#0000ff",metadata={"help":"""Color to paint the mesh-points. Valid formats are: hex RGB string (single color), or a matplotlib.Colormap name."""})
         grid_color : str = field(default="#000000",metadata={"help":"""Color to paint the grid-lines. Valid formats are: hex RGB string (single color), or a matplotlib.Colormap name."""})
         paint_parameter : typing.Literal["alpha","beta"] = field(default="beta",metadata={"help":"""Parameter to which the color index in the colormap is associated. Only effective when a colomap is used."""})
+        renderer : typing.Literal["vector","polyline","raster"] = field(default="vector",metadata={"help":"""Draw mesh-points and grid-lines as individual artists (vector), draw every grid-line as one simplified path (polyline), which keeps vector output small, or accumulate them into a single image (raster), which stays fast for very large meshes."""})
+        polyline_tolerance : float = field(default=0.25,metadata={"help":"""Maximum distance, in pixels, between a simplified grid-line and the mesh-points it skips. Only effective with the polyline renderer."""})
+        polyline_quantization : float = field(default=0.0625,metadata={"help":"""Grid, in pixels, to which grid-line vertices are snapped before simplification (0 disables). Only effective with the polyline renderer."""})
+        cull : typing.Literal["auto","always","never"] = field(default="auto",metadata={"help":"""Drop the mesh-points and grid-lines that are not finite or lie outside the plot before drawing (always), or draw every one of them (never). With auto, the ones outside the plot are kept in figures shown in an interactive window, where panning and zooming would otherwise reveal blank space."""})
+        cull_jump : float = field(default=0.5,metadata={"help":"""Cut grid-lines where consecutive mesh-points are further apart than this fraction of the plot width, which hides lines spanning poles and branch cuts (0 disables). Ignored with --cull never."""})
 
     @dataclass(kw_only=True)
     class FigureConfig(ConfigGroupDataclass):
@@ -80,21 +115,87 @@ class HoloMapConfig(SelfParsingDataclass):
         show_grid : bool = field(default=False,metadata={"help":"""Show grid at tickrate interval."""})
         show_spines : bool = field(default=False,metadata={"help":"""Show border spines around the plot."""})
 
+    @dataclass(kw_only=True)
+    class CacheConfig(ConfigGroupDataclass):
+        _config_group_title = "CACHE"
+
+        cache_dir : str = field(default="",metadata={"help":"""Directory in which computed meshes are kept between runs. Leave empty to disable the on-disk cache."""})
+        cache_size : float = field(default=1024,metadata={"help":"""Maximum size in MB of the on-disk cache, least recently used meshes are removed first."""})
+
+    @dataclass(kw_only=True)
+    class ProfileConfig(ConfigGroupDataclass):
+        _config_group_title = "PROFILE"
+
+        profile : bool = field(default=False,metadata={"help":"""Record the wall time and the number of non-finite points of every render stage, and write them as a JSON report."""})
+        profile_memory : bool = field(default=False,metadata={"help":"""Also record the peak memory allocated in every stage. Tracing allocations slows down the render."""})
+        profile_output : str = field(default="",metadata={"help":"""File to write the profile report to. Leave empty to print it."""})
+
     # Class members
     domain_config : DomainConfig = field(default_factory=DomainConfig)
     mesh_config : MeshConfig = field(default_factory=MeshConfig)
     plot_config : PlotConfig = field(default_factory=PlotConfig)
     figure_config : FigureConfig = field(default_factory=FigureConfig)
     axes_config : AxesConfig = field(default_factory=AxesConfig)
+    cache_config : CacheConfig = field(default_factory=CacheConfig)
+    profile_config : ProfileConfig = field(default_factory=ProfileConfig)
+
+
+# Compiled mappings are shared by every facade in the process and keyed by the normalized expression
+@functools.lru_cache(maxsize=256)
+def _compile_mapping(f : str, backend : str = "numpy") -> typing.Callable:
+    f = ExpressionMapping(f, "z", aliases=("x","y"), backend=backend)
+    with np.errstate(all="ignore"):
+        f(np.zeros(1,dtype=complex)) # Test function
+
+    return f
+
+
+def _is_interactive(ax : "mpl_axes.Axes") -> bool:
+    # Figures shown in a window, which can be panned and zoomed past the plotted extent
+    import matplotlib as mpl
+    from matplotlib.backends import backend_registry, BackendFilter
+
+    return ax.figure.canvas.manager is not None and mpl.get_backend().lower() in backend_registry.list_builtin(BackendFilter.INTERACTIVE)
 
 
 class HoloMapFacade:
 
+    # Config fields each cached stage depends on, in pipeline order
+    _stage_dependencies = {
+        "domain": ("domain_config.primitive_domain","domain_config.epsilon",
+            "mesh_config.alpha_resolution","mesh_config.beta_resolution","mesh_config.sampling_method","mesh_config.seed","mesh_config.dtype",
+            "mesh_config.adaptive_max_points","mesh_config.adaptive_max_distance","mesh_config.adaptive_max_angle",
+            "mesh_config.alpha_accumulate_values","mesh_config.beta_accumulate_values",
+            "mesh_config.alpha_accumulate_concentration","mesh_config.beta_accumulate_concentration",
+            "mesh_config.mesh_accumulate_points","mesh_config.mesh_accumulate_sharpness","mesh_config.mesh_accumulate_cutoff"),
+        "primitive_mappings": ("domain_config.primitive_domain_mappings","mesh_config.backend"),
+        "mappings": ("domain_config.mappings","mesh_config.backend"),
+    }
+
     # Add cache fields
-    def __init__(self, config : HoloMapConfig):
+    def __init__(self, config : HoloMapConfig, *, mesh_store : MeshStore = default_mesh_store, profiler : Profiler = None):
         self.config = config
+        self.mesh_store = mesh_store # Shared with other facades, meshes are keyed by their configuration
+
+        # Renders are recorded by the profiler, when given or enabled in the config
+        if profiler is None and self.config.profile_config.profile:
+            profiler = Profiler(trace_memory=self.config.profile_config.profile_memory)
+        self.profiler = profiler
+
+        self.make_figure, self.__make_figure = self.__make_figure, self.make_figure
+        self.plot_mesh, self.__plot_mesh = self.__plot_mesh, self.plot_mesh
+
+        self._evaluator = ParallelEvaluator(1)
+        self._disk_store : DiskMeshStore = None
+        self._stages : dict[str,typing.Tuple[typing.Any,typing.Any]] = dict()
+        self.stage_report : dict[str,bool] = dict() # Whether each stage was reused in the last plot_mesh call
+
+        # Unseeded random sampling draws one seed per facade, shared by all of its meshes
+        self._seed = np.random.SeedSequence().entropy
+
+    def make_figure(self) -> "mpl_figure.Figure":
+        import matplotlib.pyplot as plt
 
-    def make_figure(self) -> mpl_figure.Figure:
         plt.style.use(self.config.plot_config.plot_style) # Set style
 
         if self.config.figure_config.only_transformed_mesh:
@@ -108,17 +209,89 @@ class HoloMapFacade:
 
         return fig
 
-    def plot_mesh(self, ax_init : mpl_axes.Axes = None, ax_trans : mpl_axes.Axes = None):
+    def __make_figure(self) -> "mpl_figure.Figure":
+        with self._profiling(), profile_stage("make_figure"):
+            return self.__make_figure()
+
+    def __plot_mesh(self, ax_init : "mpl_axes.Axes" = None, ax_trans : "mpl_axes.Axes" = None):
+        with self._profiling(), profile_stage("plot_mesh"):
+            self.__plot_mesh(ax_init, ax_trans)
+
+    def plot_mesh(self, ax_init : "mpl_axes.Axes" = None, ax_trans : "mpl_axes.Axes" = None):
+        import matplotlib as mpl
+        from src.mesh_plotter import MeshPlotter, PolylineMeshPlotter, RasterMeshPlotter
 
-        # Get mappings
-        mappings = list(map(self.parse_mapping,self.config.domain_config.mappings))
-        #mappings = [sympy.lambdify(sympy.Symbol("z"), self._preprocess_and_validate_mappings(f), "numpy") if isinstance(f,str) else f for f in self.config.domain_config.mappings]
-        primitive_domain_mappings = [sympy.lambdify(sympy.Symbol("z"), f, "numpy") if isinstance(f,str) else f for f in self.config.domain_config.primitive_domain_mappings]
+        self.stage_report = dict()
+
+        # Meshes of the mesh-points and, when sampled separately, of the alpha and beta grid-lines
+        with profile_stage("meshes"):
+            self._get_evaluator() # Reused stages evaluate with the current parallel config
+            meshes = [self._get_meshes()]
+            if self.config.mesh_config.line_samples:
+                meshes += [self._get_meshes(lines=0), self._get_meshes(lines=1)]
+
+        # Get points, the transformed meshes are derived from the points of the initial ones
+        with shared_evaluation(), profile_stage("points"):
+            meshes_2D = [(ComplexToMesh2D(init_mesh).get_mesh_points(), ComplexToMesh2D(trans_mesh).get_mesh_points()) for init_mesh, trans_mesh in meshes]
 
         # Get color/colormap
         points_color = self.config.plot_config.points_color if self.config.plot_config.points_color.startswith("#") else mpl.colormaps[self.config.plot_config.points_color]
         grid_color = self.config.plot_config.grid_color if self.config.plot_config.grid_color.startswith("#") else mpl.colormaps[self.config.plot_config.grid_color]
 
+        # Get mesh plotter
+        plotter_args = dict(
+            markersize=self.config.plot_config.markersize,
+            linewidth=self.config.plot_config.linewidth,
+            points_color=points_color,
+            grid_color=grid_color,
+            paint_parameter=self.config.plot_config.paint_parameter)
+
+        match self.config.plot_config.renderer:
+            case "vector": mesh_plotter = MeshPlotter(**plotter_args)
+            case "polyline": mesh_plotter = PolylineMeshPlotter(extent=self.config.axes_config.axis_scale,
+                tolerance=self.config.plot_config.polyline_tolerance,quantization=self.config.plot_config.polyline_quantization,**plotter_args)
+            case "raster": mesh_plotter = RasterMeshPlotter(extent=self.config.axes_config.axis_scale,**plotter_args)
+
+        for ax, index in ((ax_init,0),(ax_trans,1)):
+            if ax is None: continue
+
+            # Points and segments which cannot show in the plot are dropped before drawing
+            culler = None
+            if self.config.plot_config.cull != "never":
+                cull_viewport = self.config.plot_config.cull == "always" or not _is_interactive(ax)
+                culler = ViewportCuller(extent=self.config.axes_config.axis_scale if cull_viewport else None,
+                    max_jump=self.config.plot_config.cull_jump*2*self.config.axes_config.axis_scale)
+
+            points = [mesh_2D[index] for mesh_2D in meshes_2D]
+            with profile_stage("cull"):
+                masks = culler and [culler.get_mask(p) for p in points]
+
+            with profile_stage("plot"):
+                if len(points) == 1:
+                    mesh_plotter.plot_mesh(points[0],ax,masks and masks[0])
+                else:
+                    mesh_plotter.plot_grid_lines(points[1],points[2],points[0],ax,masks and (masks[1],masks[2],masks[0]))
+                self._restyle_axes(ax)
+
+        self.stage_report["plot"] = False
+
+    def _get_meshes(self, lines : int = None) -> typing.Tuple[CachedMesh,CachedMesh]:
+        # Meshes, reused from the previous call when their configuration did not change
+        variant = "" if lines is None else ("_alpha_lines","_beta_lines")[lines]
+
+        domain_key, domain_mesh = self._get_stage("domain", None, lambda store_key: self._build_domain_mesh(store_key, lines), variant)
+        init_key, init_mesh = self._get_stage("primitive_mappings", domain_key,
+            lambda store_key: CachedMesh(TransformedMesh(domain_mesh,
+                list(map(self.parse_mapping,self.config.domain_config.primitive_domain_mappings)),
+                evaluator=self._get_evaluator()),store=self._get_mesh_store(),key=store_key), variant)
+        _, trans_mesh = self._get_stage("mappings", init_key,
+            lambda store_key: CachedMesh(TransformedMesh(init_mesh,
+                list(map(self.parse_mapping,self.config.domain_config.mappings)),
+                evaluator=self._get_evaluator()),store=self._get_mesh_store(),key=store_key), variant)
+
+        return init_mesh, trans_mesh
+
+    def _build_domain_mesh(self, store_key : str, lines : int = None) -> CachedMesh:
         # Starting Domain
         match self.config.domain_config.primitive_domain:
             case "disk": domain = RadialComplexDomain(epsilon=self.config.domain_config.epsilon)
@@ -127,42 +300,87 @@ class HoloMapFacade:
             case "half_plane": domain = QuadrantsComplexDomain(reflect_x=True,epsilon=self.config.domain_config.epsilon)
 
         # Mesh
-        init_mesh = build_domain_mesh(
+        return build_domain_mesh(
             domain,
             self.config.mesh_config.alpha_resolution,
             self.config.mesh_config.beta_resolution,
             sampling_method=self.config.mesh_config.sampling_method,
+            sampling_args=self._get_sampling_args(),
+            dtype=self.config.mesh_config.dtype,
             mesh_accumulate_points=self.config.mesh_config.mesh_accumulate_points,
-            mesh_accumulate_args=dict(sharpness=self.config.mesh_config.mesh_accumulate_sharpness),
+            mesh_accumulate_args=dict(
+                sharpness=self.config.mesh_config.mesh_accumulate_sharpness,
+                cutoff=self.config.mesh_config.mesh_accumulate_cutoff or None),
             alpha_accumulate_values=self.config.mesh_config.alpha_accumulate_values,
             beta_accumulate_values=self.config.mesh_config.beta_accumulate_values,
+            line_samples=self.config.mesh_config.line_samples if lines is not None else None,
+            line_axis=lines or 0,
             parameter_accumulation_args=dict(
                 alpha_concentration=self.config.mesh_config.alpha_accumulate_concentration,
                 beta_concentration=self.config.mesh_config.beta_accumulate_concentration),
-            transformations=primitive_domain_mappings)
-
-        init_mesh = ComplexToMesh2D(init_mesh)
-        trans_mesh = init_mesh.transfom_mesh(mappings) # Transform mesh
-
-        # Get points
-        init_2D = init_mesh.get_mesh_points()
-        trans_2D = trans_mesh.get_mesh_points()
-
-        # Get mesh plotter
-        mesh_plotter = MeshPlotter(
-            markersize=self.config.plot_config.markersize,
-            linewidth=self.config.plot_config.linewidth,
-            points_color=points_color,
-            grid_color=grid_color,
-            paint_parameter=self.config.plot_config.paint_parameter)
-
-        if ax_init is not None:
-            mesh_plotter.plot_mesh(init_2D,ax_init)
-            self._restyle_axes(ax_init)
-        if ax_trans is not None:
-            mesh_plotter.plot_mesh(trans_2D,ax_trans)
-            self._restyle_axes(ax_trans)
-
+            use_cache=True,
+            cache_store=self._get_mesh_store(),
+            cache_key=store_key)
+
+    def _get_sampling_args(self) -> dict:
+        match self.config.mesh_config.sampling_method:
+            case "adaptive": return dict(
+                transformations=list(map(self.parse_mapping,(*self.config.domain_config.primitive_domain_mappings,*self.config.domain_config.mappings))),
+                max_points=self.config.mesh_config.adaptive_max_points,
+                max_distance=self.config.mesh_config.adaptive_max_distance,
+                max_angle=self.config.mesh_config.adaptive_max_angle,
+                extent=self.config.axes_config.axis_scale)
+            case "random" | "sobol" | "halton": return dict(seed=self._get_seed())
+
+        return None
+
+    def _get_seed(self) -> int:
+        return self.config.mesh_config.seed if self.config.mesh_config.seed >= 0 else self._seed
+
+    def _get_mesh_store(self) -> MeshStore | DiskMeshStore:
+        if not self.config.cache_config.cache_dir:
+            return self.mesh_store
+
+        max_bytes = int(self.config.cache_config.cache_size*2**20)
+        if self._disk_store is None or (self._disk_store.directory, self._disk_store.max_bytes) != (self.config.cache_config.cache_dir, max_bytes):
+            self._disk_store = DiskMeshStore(self.config.cache_config.cache_dir, max_bytes)
+
+        return self._disk_store
+
+    def _get_stage(self, stage : str, parent_key : typing.Any, build : typing.Callable[[str],typing.Any], variant : str = "") -> typing.Tuple[typing.Any,typing.Any]:
+        # A stage is rebuilt when one of its config fields or an upstream stage changed
+        dependencies = self._stage_dependencies[stage]
+        if stage == "domain" and self.config.mesh_config.sampling_method == "adaptive": # Refined for the mappings and the plotted window
+            dependencies += self._stage_dependencies["primitive_mappings"] + self._stage_dependencies["mappings"] + ("axes_config.axis_scale",)
+        if stage == "domain" and variant:
+            dependencies += ("mesh_config.line_samples",)
+        stage += variant
+
+        values = (op.attrgetter(path)(self.config) for path in dependencies)
+        key = (parent_key, copy.deepcopy(tuple(tuple(v) if isinstance(v,list) else v for v in values)))
+
+        reused = stage in self._stages and self._stages[stage][0] == key
+        if not reused:
+            # Unseeded random meshes are not shared through the store, every facade draws its own samples
+            seeded = self.config.mesh_config.sampling_method not in ("random","sobol","halton") or self.config.mesh_config.seed >= 0
+            store_key = hash_key(stage, key) if seeded else None
+            self._stages[stage] = key, build(store_key)
+
+        self.stage_report[stage] = reused
+        return self._stages[stage]
+
+    def _profiling(self) -> typing.ContextManager:
+        return profiling(self.profiler) if self.profiler is not None else contextlib.nullcontext()
+
+    def _get_evaluator(self) -> ParallelEvaluator:
+        # Every stage holds the same evaluator, which follows the parallel config so that reused stages never keep an outdated pool.
+        # Worker pools are kept alive between renders, a single worker evaluates serially
+        workers, pool = self.config.mesh_config.workers or os.cpu_count(), self.config.mesh_config.worker_pool
+        if (self._evaluator.workers, self._evaluator.pool) != (workers, pool):
+            self._evaluator.shutdown()
+            self._evaluator.workers, self._evaluator.pool = workers, pool
+
+        return self._evaluator
 
     def parse_mapping(self, f : typing.Union[str,typing.Callable]):
 
@@ -171,23 +389,25 @@ class HoloMapFacade:
 
         f_str = f
 
-        f.strip(" ")
-        f = f.replace("x","z").replace("y","z")
+        f = " ".join(f.split())
 
-        f = re.sub("([0-9]+)i","\\1j",f)
-        f = re.sub("\\Wi","1j",f)
+        try:
+            with profile_stage("compile"):
+                return _compile_mapping(f, self.config.mesh_config.backend)
+        except Exception as e:
+            raise ValueError(f"The expresion {f_str} is not valid. {e}") from None
 
-        f = f.replace("^","**")
+    @staticmethod
+    def mapping_cache_info(): # Hit/miss statistics of the compiled mapping cache
+        return _compile_mapping.cache_info()
 
-        try:
-            f = sympy.lambdify(sympy.Symbol("z"), f, "numpy")
-            f(0) # Test function
-        except:
-            raise ValueError(f"The expresion {f_str} is not valid.")
+    @staticmethod
+    def clear_mapping_cache():
+        _compile_mapping.cache_clear()
 
-        return f
+    def _restyle_axes(self, axs : "mpl_axes.Axes"):
+        import matplotlib.pyplot as plt
 
-    def _restyle_axes(self, axs : mpl_axes.Axes):
         axs.axhline(color=self.config.axes_config.axis_line_color,linewidth=self.config.axes_config.axis_linewidth)
         axs.axvline(color=self.config.axes_config.axis_line_color,linewidth=self.config.axes_config.axis_linewidth)
 
@@ -212,4 +432,16 @@ if __name__ == "__main__":
     holomap_facade = HoloMapFacade(holomap_config)
 
     fig = holomap_facade.make_figure()
+
+    if holomap_facade.profiler is not None:
+        with profiling(holomap_facade.profiler), profile_stage("draw"):
+            fig.canvas.draw()
+
+        report = holomap_facade.profiler.to_json(indent=2)
+        if holomap_config.profile_config.profile_output:
+            with open(holomap_config.profile_config.profile_output,"w") as f: f.write(report)
+        else:
+            print(report)
+
+    import matplotlib.pyplot as plt
     plt.show()